@@ -1,6 +1,11 @@
 from django.contrib import admin
 from django import forms
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Count
+from django.utils.functional import cached_property
 
+from .images import schedule_variants
 from .models import (
     Ingredient,
     Recipe,
@@ -12,10 +17,77 @@ from .models import (
     Follow
 )
 
-admin.site.register(Favorite)
-admin.site.register(UserCart)
-admin.site.register(Follow)
-admin.site.register(Tag)
+# Ниже этого числа строк таблицы считаются точно.
+APPROXIMATE_COUNT_THRESHOLD = 100_000
+
+
+class ApproximateCountPaginator(Paginator):
+    """Для больших таблиц без фильтров берёт оценку числа строк.
+
+    На PostgreSQL оценка читается из pg_class.reltuples вместо
+    полного COUNT(*), остальные случаи считаются как обычно.
+    """
+
+    @cached_property
+    def count(self):
+        query = self.object_list.query
+        connection = connections[self.object_list.db]
+        if connection.vendor == "postgresql" and not query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class "
+                    "WHERE oid = %s::regclass",
+                    (query.model._meta.db_table,),
+                )
+                row = cursor.fetchone()
+            if row and row[0] > APPROXIMATE_COUNT_THRESHOLD:
+                return row[0]
+        return super().count
+
+
+class ScalableAdmin(admin.ModelAdmin):
+    paginator = ApproximateCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+
+@admin.register(Tag)
+class TagAdmin(admin.ModelAdmin):
+    list_display = ("name", "slug", "color", "recipes_count")
+    search_fields = ("name", "slug")
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            recipes_count=Count("recipe")
+        )
+
+    @admin.display(description="Рецептов", ordering="recipes_count")
+    def recipes_count(self, tag):
+        return tag.recipes_count
+
+
+@admin.register(Favorite)
+class FavoriteAdmin(ScalableAdmin):
+    list_display = ("pk", "user", "recipe", "created")
+    list_select_related = ("user", "recipe")
+    autocomplete_fields = ("user", "recipe")
+    search_fields = ("user__email", "recipe__name")
+
+
+@admin.register(UserCart)
+class UserCartAdmin(ScalableAdmin):
+    list_display = ("pk", "user", "recipe", "created")
+    list_select_related = ("user", "recipe")
+    autocomplete_fields = ("user", "recipe")
+    search_fields = ("user__email", "recipe__name")
+
+
+@admin.register(Follow)
+class FollowAdmin(ScalableAdmin):
+    list_display = ("pk", "user", "author")
+    list_select_related = ("user", "author")
+    autocomplete_fields = ("user", "author")
+    search_fields = ("user__email", "author__email")
 
 
 class InlineFormset(forms.models.BaseInlineFormSet):
@@ -31,30 +103,56 @@ class IngredientInline(admin.TabularInline):
     min_num = 1
     formset = InlineFormset
     extra = 0
+    autocomplete_fields = ("ingredient",)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("ingredient")
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
-    list_display = ("name", "author", "count_favorites")
-    list_filter = ("author", "name", "tags")
+class RecipeAdmin(ScalableAdmin):
+    list_display = ("name", "author", "pub_date", "count_favorites")
+    list_select_related = ("author",)
+    list_filter = ("tags",)
+    search_fields = ("name", "author__email")
+    autocomplete_fields = ("author", "tags")
+    date_hierarchy = "pub_date"
     inlines = (IngredientInline,)
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).defer("search_vector", "text")
+
+    @admin.display(description="В избранном", ordering="favorites_count")
     def count_favorites(self, recipe):
-        return recipe.favorite_by_user.count()
+        return recipe.favorites_count
+
+    def save_model(self, request, recipe, form, change):
+        super().save_model(request, recipe, form, change)
+        if "image" in form.changed_data:
+            schedule_variants(recipe)
 
 
 @admin.register(User)
-class UserAdmin(admin.ModelAdmin):
-    list_filter = ("username", "email")
+class UserAdmin(ScalableAdmin):
+    list_display = (
+        "email", "username", "first_name", "last_name",
+        "recipes_count", "followers_count",
+    )
+    list_filter = ("is_active", "is_staff")
+    search_fields = ("email", "username")
+    date_hierarchy = "date_joined"
 
 
 @admin.register(Ingredient)
-class IngredientAdmin(admin.ModelAdmin):
+class IngredientAdmin(ScalableAdmin):
     list_display = ('pk', 'name', 'measurement_unit')
-    list_filter = ('name',)
+    search_fields = ('^name',)
 
 
 @admin.register(Amount)
-class AmountAdmin(admin.ModelAdmin):
+class AmountAdmin(ScalableAdmin):
     list_display = ('pk', 'recipe', 'ingredient', 'amount')
-    list_editable = ('ingredient', 'amount')
+    list_editable = ('amount',)
+    list_select_related = ('recipe', 'ingredient')
+    autocomplete_fields = ('recipe', 'ingredient')
+    search_fields = ('recipe__name',)
@@ -0,0 +1,370 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.authentication import get_authorization_header
+from rest_framework.request import Request
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .authentication import token_cache
+from .filters import AuthorTagFilter, IngredientFilter, get_limit
+from .ingredient_index import get_index
+from .metrics import measure
+from .models import Ingredient, Recipe, Tag, User
+from .pagination import MODE_PARAM
+from .renderers import FastJSONRenderer, should_stream
+from .response_cache import aget_or_build, response_key
+from .serializers import (
+    FollowSerializer,
+    IngredientSerializer,
+    RecipeSerializer,
+    TagSerializer,
+)
+from .versions import (
+    INGREDIENTS_VERSION,
+    TAGS_VERSION,
+    get_version,
+)
+from .views import RecipeViewSet, TagsViewSet
+
+JSON_MEDIA_TYPES = ("", "*/*", "application/*", "application/json")
+RENDERER = FastJSONRenderer()
+
+
+class FallbackError(Exception):
+    """Ответ построит синхронный view."""
+
+
+def accepts_json(request):
+    """Отдаст ли DRF на этот запрос FastJSONRenderer."""
+    accept = request.headers.get("Accept", "")
+    # С indent DRF рендерит с отступами.
+    if "format" in request.GET or "indent=" in accept:
+        return False
+    media_types = [
+        media_type.split(";")[0].strip()
+        for media_type in accept.split(",")
+    ]
+    return all(media_type in JSON_MEDIA_TYPES for media_type in media_types)
+
+
+async def authenticate(request):
+    """Пользователь по заголовку Token как в CachedTokenAuthentication.
+
+    None - заголовок неверный, ответ с ошибкой отдаст синхронный view.
+    """
+    auth = get_authorization_header(request).split()
+    if not auth or auth[0].lower() != b"token":
+        return AnonymousUser()
+    if len(auth) != 2:
+        return None
+    try:
+        key = auth[1].decode()
+    except UnicodeError:
+        return None
+    token = await sync_to_async(token_cache.load)(key)
+    if token is None or not token.user.is_active:
+        return None
+    return token.user
+
+
+def allowed_methods(sync_view):
+    """Заголовок Allow, который DRF ставит этому маршруту."""
+    methods = set(sync_view.actions) | {"options"}
+    if "get" in methods:
+        methods.add("head")
+    return ", ".join(
+        method.upper() for method in sync_view.cls.http_method_names
+        if method in methods
+    )
+
+
+async def chunks(iterator):
+    for chunk in iterator:
+        yield chunk
+
+
+def json_response(data, sync_view, status=200):
+    if should_stream(RENDERER, data):
+        response = StreamingHttpResponse(
+            chunks(RENDERER.stream(data)),
+            content_type=RENDERER.media_type,
+            status=status,
+        )
+    else:
+        with measure("render"):
+            response = HttpResponse(
+                RENDERER.render(data),
+                content_type=RENDERER.media_type,
+                status=status,
+            )
+    response["Vary"] = "Accept"
+    response["Allow"] = allowed_methods(sync_view)
+    return response
+
+
+def serialize(serializer_class, instance, request, many=False):
+    with measure("serialize"):
+        return serializer_class(
+            instance,
+            many=many,
+            context={"request": request, "format": None, "view": None},
+        ).data
+
+
+async def paginate(queryset, request, page_size):
+    """Страница как у PageNumberPagination."""
+    page = request.query_params.get("page", "1")
+    if not page.isdigit() or int(page) < 1:
+        raise FallbackError
+    page = int(page)
+    count = await queryset.acount()
+    if page > 1 and (page - 1) * page_size >= count:
+        raise FallbackError
+    offset = (page - 1) * page_size
+    items = [item async for item in queryset[offset:offset + page_size]]
+    url = request.build_absolute_uri()
+    if offset + page_size < count:
+        next_link = replace_query_param(url, "page", page + 1)
+    else:
+        next_link = None
+    if page == 1:
+        previous_link = None
+    elif page == 2:
+        previous_link = remove_query_param(url, "page")
+    else:
+        previous_link = replace_query_param(url, "page", page - 1)
+    return count, next_link, previous_link, items
+
+
+def paginated(count, next_link, previous_link, results):
+    return {
+        "count": count,
+        "next": next_link,
+        "previous": previous_link,
+        "results": results,
+    }
+
+
+async def conditional(request, name, build):
+    """versioned_condition для async-обработчиков."""
+    version = await sync_to_async(get_version)(name)
+    etag = f'"{name}-{version}"'
+    last_modified = version // 10 ** 9
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        response = await build()
+    if not response.has_header("Last-Modified"):
+        response.headers["Last-Modified"] = http_date(last_modified)
+    response.headers.setdefault("ETag", etag)
+    return response
+
+
+def async_read(handler):
+    """Отдаёт GET из async-обработчика, остальное - синхронному view.
+
+    Обработчик получает DRF Request с пользователем и бросает FallbackError,
+    если запрос ему не по силам: неизвестные параметры, ошибки и 404
+    отдаёт синхронный ViewSet, поэтому ответы совпадают.
+    """
+
+    def bind(sync_view):
+        @wraps(sync_view)
+        async def view(request, *args, **kwargs):
+            if request.method == "GET" and accepts_json(request):
+                user = await authenticate(request)
+                if user is not None:
+                    drf_request = Request(request)
+                    drf_request.user = user
+                    try:
+                        return await handler(
+                            drf_request, sync_view, *args, **kwargs
+                        )
+                    except FallbackError:
+                        pass
+            return await sync_to_async(sync_view)(request, *args, **kwargs)
+
+        return view
+
+    return bind
+
+
+async def filtered_recipes(request):
+    filterset = AuthorTagFilter(
+        request.query_params,
+        queryset=Recipe.objects.for_feed(request.user),
+        request=request,
+    )
+    # Проверка формы может читать базу, например автора по id.
+    if not await sync_to_async(filterset.is_valid)():
+        raise FallbackError
+    return filterset.qs
+
+
+async def cached_for_anonymous(request, action, kwargs, build):
+    """Кеш ответов AnonymousResponseCacheMixin с тем же ключом."""
+    if "HTTP_AUTHORIZATION" in request.META:
+        return await build()
+    versions = await sync_to_async(
+        RecipeViewSet().response_cache_versions
+    )(request, action, kwargs)
+    return await aget_or_build(response_key(request, versions), build)
+
+
+@async_read
+async def recipe_list(request, sync_view):
+    if MODE_PARAM in request.query_params:
+        raise FallbackError
+
+    async def build():
+        page = await paginate(
+            await filtered_recipes(request),
+            request,
+            RecipeViewSet.pagination_class.page_size,
+        )
+        *links, recipes = page
+        return json_response(
+            paginated(
+                *links,
+                serialize(RecipeSerializer, recipes, request, many=True),
+            ),
+            sync_view,
+        )
+
+    return await cached_for_anonymous(
+        request._request, "list", {}, build
+    )
+
+
+@async_read
+async def recipe_detail(request, sync_view, pk):
+    if not pk.isdigit():
+        raise FallbackError
+
+    async def build():
+        queryset = await filtered_recipes(request)
+        recipe = await queryset.filter(pk=pk).afirst()
+        if recipe is None:
+            raise FallbackError
+        return json_response(
+            serialize(RecipeSerializer, recipe, request), sync_view
+        )
+
+    return await cached_for_anonymous(
+        request._request, "retrieve", {"pk": pk}, build
+    )
+
+
+@async_read
+async def tag_list(request, sync_view):
+    async def load():
+        tags = [tag async for tag in Tag.objects.all()]
+        return serialize(TagSerializer, tags, request, many=True)
+
+    async def build():
+        data = await TagsViewSet.cache.aget_or_set("list", load)
+        return json_response(data, sync_view)
+
+    return await conditional(request._request, TAGS_VERSION, build)
+
+
+@async_read
+async def tag_detail(request, sync_view, pk):
+    if not pk.isdigit():
+        raise FallbackError
+
+    async def load():
+        tag = await Tag.objects.filter(pk=pk).afirst()
+        if tag is None:
+            raise FallbackError
+        return serialize(TagSerializer, tag, request)
+
+    async def build():
+        data = await TagsViewSet.cache.aget_or_set(("retrieve", pk), load)
+        return json_response(data, sync_view)
+
+    return await conditional(request._request, TAGS_VERSION, build)
+
+
+@async_read
+async def ingredient_list(request, sync_view):
+    async def build():
+        limit = get_limit(request)
+        name = request.query_params.get(IngredientFilter.search_param)
+        if settings.INGREDIENT_PREFIX_INDEX:
+            index = await sync_to_async(get_index)()
+            data = index.search(name, limit) if name else index.all(limit)
+        else:
+            queryset = IngredientFilter().filter_queryset(
+                request, Ingredient.objects.all(), None
+            )[:limit]
+            data = serialize(
+                IngredientSerializer,
+                [ingredient async for ingredient in queryset],
+                request,
+                many=True,
+            )
+        return json_response(data, sync_view)
+
+    return await conditional(request._request, INGREDIENTS_VERSION, build)
+
+
+@async_read
+async def ingredient_detail(request, sync_view, pk):
+    if not pk.isdigit():
+        raise FallbackError
+
+    async def build():
+        if settings.INGREDIENT_PREFIX_INDEX:
+            index = await sync_to_async(get_index)()
+            data = index.by_id.get(int(pk))
+        else:
+            ingredient = await Ingredient.objects.filter(pk=pk).afirst()
+            data = ingredient and serialize(
+                IngredientSerializer, ingredient, request
+            )
+        if data is None:
+            raise FallbackError
+        return json_response(data, sync_view)
+
+    return await conditional(request._request, INGREDIENTS_VERSION, build)
+
+
+@async_read
+async def subscriptions(request, sync_view):
+    if (
+        not request.user.is_authenticated
+        or MODE_PARAM in request.query_params
+    ):
+        raise FallbackError
+    authors = User.objects.subscriptions(
+        request.user, get_limit(request, "recipes_limit")
+    )
+    page = await paginate(
+        authors, request, sync_view.cls.pagination_class.page_size
+    )
+    *links, authors = page
+    return json_response(
+        paginated(
+            *links, serialize(FollowSerializer, authors, request, many=True)
+        ),
+        sync_view,
+    )
+
+
+# Имя маршрута роутера: async-обработчик GET.
+HANDLERS = {
+    "recipe-list": recipe_list,
+    "recipe-detail": recipe_detail,
+    "tag-list": tag_list,
+    "tag-detail": tag_detail,
+    "ingredient-list": ingredient_list,
+    "ingredient-detail": ingredient_detail,
+    "user-subscriptions": subscriptions,
+}
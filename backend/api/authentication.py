@@ -0,0 +1,98 @@
+import copy
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from .versions import bump_versions_on_commit, get_version
+
+
+def auth_version(key):
+    return f"auth:{key}"
+
+
+def invalidate_tokens(*keys):
+    """Сбрасывает закешированные токены во всех процессах."""
+    bump_versions_on_commit(*map(auth_version, keys))
+
+
+class TokenCache:
+    """LRU-кеш процесса: ключ токена -> токен с пользователем.
+
+    Запись живёт не дольше timeout секунд и сбрасывается сменой версии
+    auth:<ключ>, которую меняют сигналы выхода, смены пароля и
+    деактивации. Изменения в обход сигналов, например QuerySet.update(),
+    видны через timeout.
+    """
+
+    def __init__(self, max_size, timeout):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.lock = Lock()
+        self.entries = OrderedDict()
+
+    def get(self, key, version):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            token, expires, cached_version = entry
+            if expires < time.monotonic() or cached_version != version:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return token
+
+    def set(self, key, token, version):
+        with self.lock:
+            self.entries[key] = (
+                token, time.monotonic() + self.timeout, version
+            )
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def load(self, key):
+        """Копия токена с пользователем из кеша или из базы.
+
+        None - токена нет. Копия нужна, чтобы view мог менять
+        request.user, не трогая кеш.
+        """
+        # Версия читается до базы: если её сменят после чтения,
+        # запись со старыми данными не совпадёт с новой версией.
+        version = get_version(auth_version(key))
+        token = self.get(key, version)
+        if token is None:
+            token = Token.objects.select_related("user").filter(
+                key=key
+            ).first()
+            if token is None:
+                return None
+            self.set(key, token, version)
+        token = copy.copy(token)
+        token.user = copy.copy(token.user)
+        return token
+
+
+token_cache = TokenCache(
+    settings.AUTH_TOKEN_CACHE_SIZE, settings.AUTH_TOKEN_CACHE_TIMEOUT
+)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication с кешем токенов процесса."""
+
+    def authenticate_credentials(self, key):
+        token = token_cache.load(key)
+        if token is None:
+            raise exceptions.AuthenticationFailed(_("Invalid token."))
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _("User inactive or deleted.")
+            )
+        return (token.user, token)
@@ -0,0 +1,78 @@
+from django.db.models import F, Sum
+from django.db.transaction import atomic
+
+from .models import Amount, CartIngredient, UserCart
+
+
+def live_totals(user_ids=None, ingredient_ids=None):
+    """Суммы ингредиентов в корзинах, посчитанные по Amount."""
+    amounts = Amount.objects.all()
+    if user_ids is not None:
+        amounts = amounts.filter(recipe__in_user_cart__user__in=user_ids)
+    if ingredient_ids is not None:
+        amounts = amounts.filter(ingredient_id__in=ingredient_ids)
+    return amounts.values(
+        "ingredient_id", user_id=F("recipe__in_user_cart__user"),
+    ).annotate(
+        total=Sum("amount")
+    ).filter(user_id__isnull=False).order_by()
+
+
+@atomic()
+def refresh_cart_totals(user_ids, ingredient_ids=None):
+    """Пересчитывает суммы корзин для пользователей.
+
+    Если переданы ingredient_ids, пересчитываются только эти
+    ингредиенты, остальные строки не трогаются.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    totals = {
+        (row["user_id"], row["ingredient_id"]): row["total"]
+        for row in live_totals(user_ids, ingredient_ids)
+    }
+    stored = CartIngredient.objects.filter(user_id__in=user_ids)
+    if ingredient_ids is not None:
+        stored = stored.filter(ingredient_id__in=ingredient_ids)
+    stale = [
+        pk for pk, user_id, ingredient_id in stored.values_list(
+            "pk", "user_id", "ingredient_id"
+        ) if (user_id, ingredient_id) not in totals
+    ]
+    if stale:
+        CartIngredient.objects.filter(pk__in=stale).delete()
+    CartIngredient.objects.bulk_create(
+        [
+            CartIngredient(
+                user_id=user_id, ingredient_id=ingredient_id, total=total
+            )
+            for (user_id, ingredient_id), total in totals.items()
+        ],
+        update_conflicts=True,
+        unique_fields=("user", "ingredient"),
+        update_fields=("total",),
+    )
+
+
+def refresh_recipe_carts(recipe_id, ingredient_ids=None):
+    """Пересчитывает корзины всех, у кого в корзине рецепт."""
+    refresh_cart_totals(
+        UserCart.objects.filter(recipe_id=recipe_id).values_list(
+            "user_id", flat=True
+        ),
+        ingredient_ids,
+    )
+
+
+def recipe_added(user_id, recipe_id):
+    refresh_cart_totals(
+        [user_id],
+        Amount.objects.filter(recipe_id=recipe_id).values_list(
+            "ingredient_id", flat=True
+        ),
+    )
+
+
+def recipe_removed(user_id):
+    refresh_cart_totals([user_id])
@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core import checks
+
+# Бэкенды, кеш которых не виден другим процессам.
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+@checks.register(checks.Tags.caches)
+def shared_cache_check(app_configs, **kwargs):
+    """Версии в кеше сбрасывают кеши всех процессов, если он общий."""
+    backend = settings.CACHES["default"]["BACKEND"]
+    if settings.DEBUG or backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [
+        checks.Warning(
+            f"Кеш {backend} не общий для процессов: индекс ингредиентов, "
+            "теги, ETag и токены в других воркерах не сбросятся при "
+            "изменениях.",
+            hint="Укажите общий кеш в CACHE_BACKEND и CACHE_LOCATION, "
+            "например django.core.cache.backends.redis.RedisCache.",
+            id="api.W001",
+        )
+    ]
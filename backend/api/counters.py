@@ -0,0 +1,46 @@
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Favorite, Follow, Recipe, User, UserCart
+
+# Счётчик: (модель со счётчиком, поле, модель строк, поле связи в ней).
+COUNTERS = (
+    (Recipe, "favorites_count", Favorite, "recipe"),
+    (Recipe, "in_carts_count", UserCart, "recipe"),
+    (User, "recipes_count", Recipe, "author"),
+    (User, "followers_count", Follow, "author"),
+)
+
+
+def change_counter(model, field, pk, delta):
+    """Атомарно меняет счётчик на delta через F(), не уходя ниже нуля."""
+    model.objects.filter(pk=pk).update(
+        **{field: Greatest(F(field) + delta, Value(0))}
+    )
+
+
+def expected_count(row_model, relation):
+    return Coalesce(
+        Subquery(
+            row_model.objects.filter(**{relation: OuterRef("pk")})
+            .order_by()
+            .values(relation)
+            .annotate(count=Count("pk"))
+            .values("count")
+        ),
+        Value(0),
+    )
+
+
+def drifted(model, field, row_model, relation):
+    """Объекты, у которых счётчик расходится с реальным числом строк."""
+    return model.objects.alias(
+        expected=expected_count(row_model, relation)
+    ).exclude(**{field: F("expected")})
+
+
+def reconcile(model, field, row_model, relation):
+    """Чинит расхождения и возвращает число исправленных объектов."""
+    return model.objects.filter(
+        pk__in=drifted(model, field, row_model, relation).values("pk")
+    ).update(**{field: expected_count(row_model, relation)})
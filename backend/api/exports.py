@@ -0,0 +1,197 @@
+import csv
+import io
+import json
+import os
+from functools import lru_cache
+
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from rest_framework.renderers import BaseRenderer
+
+from .renderers import FastJSONRenderer
+from .streaming import streaming_content
+
+FILENAME = "shopping_list"
+TITLE = "список покупок"
+FONT_NAME = "Cornerita"
+FONT_FILE = "Cornerita.ttf"
+TITLE_FONT_SIZE = 18
+FONT_SIZE = 12
+LINE_SIZE = int(FONT_SIZE * 1.5)
+MARGIN = 50
+TEXT_LEFT = 70
+TITLE_LEFT = 200
+
+
+class ExportRenderer(BaseRenderer):
+    """Рендерер формата выгрузки.
+
+    Успешный ответ формирует сам экспорт, через рендерер проходят
+    только ответы с ошибками. Они отдаются в JSON, а не под типом
+    выгрузки.
+    """
+
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        response = (renderer_context or {}).get("response")
+        if response is not None:
+            response["Content-Type"] = FastJSONRenderer.media_type
+        return FastJSONRenderer().render(data)
+
+
+class PDFRenderer(ExportRenderer):
+    media_type = "application/pdf"
+    format = "pdf"
+    charset = None
+
+
+class PlainTextRenderer(ExportRenderer):
+    media_type = "text/plain"
+    format = "txt"
+
+
+class CSVRenderer(ExportRenderer):
+    media_type = "text/csv"
+    format = "csv"
+
+
+# Первый рендерер используется по умолчанию, фронтенд ждёт PDF.
+SHOPPING_LIST_RENDERERS = (
+    PDFRenderer,
+    PlainTextRenderer,
+    CSVRenderer,
+    FastJSONRenderer,
+)
+
+
+def format_line(line_no, ingredient):
+    return (f"{line_no}. {ingredient['name']} - "
+            f"{ingredient['total_amount']}"
+            f"{ingredient['measurement_unit']}")
+
+
+def attachment(response, extension):
+    response[
+        "Content-Disposition"
+    ] = f'attachment; filename="{FILENAME}.{extension}"'
+    return response
+
+
+def text_lines(ingredients):
+    yield f"{TITLE}\n"
+    for line_no, ingredient in enumerate(ingredients, start=1):
+        yield format_line(line_no, ingredient) + "\n"
+
+
+def csv_lines(ingredients):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(("name", "measurement_unit", "amount"))
+    for ingredient in ingredients:
+        writer.writerow((
+            ingredient["name"],
+            ingredient["measurement_unit"],
+            ingredient["total_amount"],
+        ))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def json_chunks(ingredients):
+    yield "["
+    separator = ""
+    for ingredient in ingredients:
+        yield separator + json.dumps({
+            "name": ingredient["name"],
+            "measurement_unit": ingredient["measurement_unit"],
+            "amount": ingredient["total_amount"],
+        }, ensure_ascii=False)
+        separator = ","
+    yield "]"
+
+
+@lru_cache(maxsize=None)
+def register_font():
+    """Регистрирует шрифт один раз на процесс."""
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    pdfmetrics.registerFont(
+        TTFont(FONT_NAME, os.path.join(settings.BASE_DIR, FONT_FILE))
+    )
+
+
+def render_pdf(ingredients, output):
+    """Пишет PDF в output, перенося строки на новые страницы."""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    register_font()
+    _, page_height = A4
+    shopping_list_pdf = canvas.Canvas(output, pagesize=A4)
+    v_offset = page_height - MARGIN
+    shopping_list_pdf.setFont(FONT_NAME, size=TITLE_FONT_SIZE)
+    shopping_list_pdf.drawString(TITLE_LEFT, v_offset, TITLE)
+    v_offset -= MARGIN
+    shopping_list_pdf.setFont(FONT_NAME, size=FONT_SIZE)
+    for line_no, ingredient in enumerate(ingredients, start=1):
+        if v_offset < MARGIN:
+            shopping_list_pdf.showPage()
+            shopping_list_pdf.setFont(FONT_NAME, size=FONT_SIZE)
+            v_offset = page_height - MARGIN
+        shopping_list_pdf.drawString(
+            TEXT_LEFT, v_offset, format_line(line_no, ingredient)
+        )
+        v_offset -= LINE_SIZE
+    shopping_list_pdf.showPage()
+    shopping_list_pdf.save()
+
+
+def pdf_response(ingredients):
+    """PDF собирается в памяти целиком и отдаётся одним телом."""
+    output = io.BytesIO()
+    render_pdf(ingredients, output)
+    response = HttpResponse(
+        output.getvalue(), content_type=PDFRenderer.media_type
+    )
+    return attachment(response, "pdf")
+
+
+def streaming_response(request, chunks, content_type, extension):
+    response = StreamingHttpResponse(
+        streaming_content(request, chunks),
+        content_type=f"{content_type}; charset=utf-8",
+    )
+    return attachment(response, extension)
+
+
+def export_shopping_list(request, ingredients, export_format):
+    """Ответ со списком покупок в формате export_format.
+
+    ingredients - итерируемые словари с ключами name,
+    measurement_unit и total_amount.
+    """
+    if export_format == PlainTextRenderer.format:
+        return streaming_response(
+            request,
+            text_lines(ingredients),
+            PlainTextRenderer.media_type,
+            "txt",
+        )
+    if export_format == CSVRenderer.format:
+        return streaming_response(
+            request, csv_lines(ingredients), CSVRenderer.media_type, "csv"
+        )
+    if export_format == FastJSONRenderer.format:
+        return streaming_response(
+            request,
+            json_chunks(ingredients),
+            FastJSONRenderer.media_type,
+            "json",
+        )
+    return pdf_response(ingredients)
@@ -0,0 +1,95 @@
+from django.conf import settings
+
+from .models import FeedEntry, Follow, Recipe, User
+
+
+def fill(follows):
+    """Дописывает в ленты рецепты авторов из подписок follows.
+
+    Авторы с FEED_FANOUT_MAX_FOLLOWERS подписчиков и больше
+    пропускаются, их рецепты лента читает напрямую.
+    """
+    rows = follows.filter(
+        author__followers_count__lt=settings.FEED_FANOUT_MAX_FOLLOWERS,
+        author__recipes__isnull=False,
+    ).values_list("user_id", "author__recipes", "author_id")
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(user_id=user_id, recipe_id=recipe_id, author_id=author_id)
+            for user_id, recipe_id, author_id in rows.iterator(
+                chunk_size=settings.DB_STREAM_CHUNK_SIZE
+            )
+        ),
+        batch_size=settings.DB_STREAM_CHUNK_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def recipe_published(recipe):
+    """Новый рецепт в ленты подписчиков автора."""
+    if not User.objects.filter(
+        pk=recipe.author_id,
+        followers_count__lt=settings.FEED_FANOUT_MAX_FOLLOWERS,
+    ).exists():
+        return
+    followers = Follow.objects.filter(author_id=recipe.author_id).values_list(
+        "user_id", flat=True
+    )
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(
+                user_id=user_id,
+                recipe_id=recipe.pk,
+                author_id=recipe.author_id,
+            )
+            for user_id in followers.iterator(
+                chunk_size=settings.DB_STREAM_CHUNK_SIZE
+            )
+        ),
+        batch_size=settings.DB_STREAM_CHUNK_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def followed(user_id, author_id):
+    fill(Follow.objects.filter(user_id=user_id, author_id=author_id))
+
+
+def unfollowed(user_id, author_id):
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+    # Автор опустился ниже порога: рецепты, вышедшие без fan-out,
+    # дописываются в ленты оставшихся подписчиков.
+    if User.objects.filter(
+        pk=author_id,
+        followers_count=settings.FEED_FANOUT_MAX_FOLLOWERS - 1,
+    ).exists():
+        fill(Follow.objects.filter(author_id=author_id))
+
+
+def feed_recipe_ids(user, descending, after_id, limit):
+    """id рецептов ленты за курсором after_id.
+
+    Первые limit id из таблицы ленты и из рецептов крупных авторов
+    выбираются по индексам и сливаются.
+    """
+    lookup = "lt" if descending else "gt"
+    order = "-" if descending else ""
+    timeline = FeedEntry.objects.filter(user=user)
+    direct = Recipe.objects.filter(
+        author__in=Follow.objects.filter(
+            user=user,
+            author__followers_count__gte=settings.FEED_FANOUT_MAX_FOLLOWERS,
+        ).values("author_id")
+    )
+    if after_id is not None:
+        timeline = timeline.filter(**{f"recipe_id__{lookup}": after_id})
+        direct = direct.filter(**{f"id__{lookup}": after_id})
+    ids = set(
+        timeline.order_by(f"{order}recipe_id").values_list(
+            "recipe_id", flat=True
+        )[:limit]
+    )
+    ids.update(
+        direct.order_by(f"{order}id").values_list("id", flat=True)[:limit]
+    )
+    return sorted(ids, reverse=descending)[:limit]
@@ -1,35 +1,121 @@
-from rest_framework.filters import SearchFilter
+import re
+
+from django.db import connections
+from django.db.models import Exists, F, OuterRef
+from django.db.models.functions import Lower
+from rest_framework.filters import BaseFilterBackend
 
 from django_filters.rest_framework import FilterSet, filters
 
-from .models import Recipe, Tag
+from .models import Favorite, Recipe, Tag, UserCart
+from .search import search_recipes
+from .versions import TAGS_VERSION, VersionedCache
+
+tags_cache = VersionedCache(TAGS_VERSION)
+
+
+def tag_ids_by_slug():
+    return tags_cache.get_or_set(
+        "ids_by_slug", lambda: dict(Tag.objects.values_list("slug", "id"))
+    )
+
+
+def tag_choices():
+    return [(slug, slug) for slug in tag_ids_by_slug()]
 
 
 class AuthorTagFilter(FilterSet):
-    tags = filters.ModelMultipleChoiceFilter(
-        queryset=Tag.objects.all(),
-        to_field_name="slug",
-        field_name="tags__slug",
+    """Фильтры ленты рецептов.
+
+    Теги и отметки пользователя проверяются через EXISTS, поэтому
+    рецепт попадает в выборку один раз при любом числе тегов.
+    """
+
+    tags = filters.MultipleChoiceFilter(
+        choices=tag_choices,
+        method="tags_filter",
     )
     is_favorited = filters.BooleanFilter(method="favorite_filter")
     is_in_shopping_cart = filters.BooleanFilter(method="cart_filter")
+    search = filters.CharFilter(method="search_filter")
+    ordering = filters.ChoiceFilter(
+        choices=(
+            ("rank", "rank"),
+            ("popular", "popular"),
+            ("trending", "trending"),
+        ),
+        method="ordering_filter",
+    )
 
-    def favorite_filter(self, queryset, name, value):
-        current_user = self.request.user
-        if value:
-            return queryset.filter(favorite_by_user__user=current_user)
+    def search_filter(self, queryset, name, value):
+        return search_recipes(queryset, value)
+
+    def ordering_filter(self, queryset, name, value):
+        if value == "rank" and "search_rank" in queryset.query.annotations:
+            return queryset.order_by("-search_rank", "-pub_date", "-id")
+        if value == "popular":
+            return queryset.order_by("-favorites_count", "-pub_date", "-id")
+        if value == "trending":
+            # Рецепты без оценки score_trending идут после оценённых.
+            return queryset.order_by(
+                F("trending__score").desc(nulls_last=True), "-pub_date", "-id"
+            )
         return queryset
 
-    def cart_filter(self, queryset, name, value):
+    def tags_filter(self, queryset, name, value):
+        ids_by_slug = tag_ids_by_slug()
+        return queryset.filter(Exists(
+            Recipe.tags.through.objects.filter(
+                recipe=OuterRef("pk"),
+                tag_id__in=[ids_by_slug[slug] for slug in value],
+            )
+        ))
+
+    def member_filter(self, queryset, model, value):
         current_user = self.request.user
-        if value:
-            return queryset.filter(in_user_cart__user=current_user)
-        return queryset
+        if not value:
+            return queryset
+        if not current_user.is_authenticated:
+            return queryset.none()
+        return queryset.filter(Exists(
+            model.objects.filter(user=current_user, recipe=OuterRef("pk"))
+        ))
+
+    def favorite_filter(self, queryset, name, value):
+        return self.member_filter(queryset, Favorite, value)
+
+    def cart_filter(self, queryset, name, value):
+        return self.member_filter(queryset, UserCart, value)
 
     class Meta:
         model = Recipe
         fields = ("author", "tags")
 
 
-class IngredientFilter(SearchFilter):
+def get_limit(request, param="limit"):
+    """Положительное число из параметра param, иначе None."""
+    limit = request.query_params.get(param, "")
+    return int(limit) if limit.isdigit() and int(limit) > 0 else None
+
+
+class IngredientFilter(BaseFilterBackend):
+    """Поиск по началу названия без учёта регистра.
+
+    На PostgreSQL условие lower(name) LIKE 'запрос%' обслуживается
+    индексом ingredient_lower_name_idx. В SQLite LOWER() и LIKE
+    не учитывают регистр только латиницы, там работает регулярное
+    выражение Python. limit применяет IngredientsViewSet.list, иначе
+    срез ломал бы get_object().
+    """
+
     search_param = "name"
+
+    def filter_queryset(self, request, queryset, view):
+        name = request.query_params.get(self.search_param)
+        if not name:
+            return queryset
+        if connections[queryset.db].vendor != "postgresql":
+            return queryset.filter(name__iregex=f"^{re.escape(name)}")
+        return queryset.alias(lower_name=Lower("name")).filter(
+            lower_name__startswith=name.lower()
+        )
@@ -0,0 +1,114 @@
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from PIL import Image, ImageOps
+
+from .models import Recipe
+from .versions import RECIPES_VERSION, bump_version, recipe_version
+
+logger = logging.getLogger(__name__)
+
+VARIANTS_DIR = "recipes/variants"
+# Имя варианта: (ширина, высота, обрезать ли под размер).
+VARIANTS = {
+    "thumbnail": (160, 160, True),
+    "card": (600, 480, True),
+    "detail": (1200, 1200, False),
+}
+FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", {"quality": 85, "optimize": True, "progressive": True}),
+}
+
+_executor = None
+_executor_lock = Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_WORKERS,
+                thread_name_prefix="recipe-images",
+            )
+        return _executor
+
+
+def variant_name(image_name, variant, extension):
+    stem = os.path.splitext(os.path.basename(image_name))[0]
+    return f"{VARIANTS_DIR}/{stem}_{variant}.{extension}"
+
+
+def resize(image, width, height, crop):
+    if crop:
+        return ImageOps.fit(image, (width, height), Image.LANCZOS)
+    image = image.copy()
+    image.thumbnail((width, height), Image.LANCZOS)
+    return image
+
+
+def build_variants(image_name):
+    """Сохраняет все варианты картинки и возвращает их имена."""
+    with default_storage.open(image_name) as file:
+        image = ImageOps.exif_transpose(Image.open(file))
+        image = image.convert("RGB")
+    variants = {}
+    for variant, (width, height, crop) in VARIANTS.items():
+        resized = resize(image, width, height, crop)
+        variants[variant] = {}
+        for extension, (pil_format, options) in FORMATS.items():
+            output = io.BytesIO()
+            resized.save(output, pil_format, **options)
+            name = variant_name(image_name, variant, extension)
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            variants[variant][extension] = default_storage.save(
+                name, ContentFile(output.getvalue())
+            )
+    return variants
+
+
+def process_recipe_image(recipe_id, image_name):
+    try:
+        variants = build_variants(image_name)
+        # Картинку могли заменить, пока строились варианты.
+        if Recipe.objects.filter(pk=recipe_id, image=image_name).update(
+            image_variants=variants
+        ):
+            bump_version(RECIPES_VERSION)
+            bump_version(recipe_version(recipe_id))
+    except Exception:
+        logger.exception("Не удалось обработать картинку %s", image_name)
+        raise
+    finally:
+        connections.close_all()
+
+
+def schedule_variants(recipe):
+    """Строит варианты картинки рецепта в пуле после коммита."""
+    recipe_id, image_name = recipe.pk, recipe.image.name
+    transaction.on_commit(
+        lambda: get_executor().submit(
+            process_recipe_image, recipe_id, image_name
+        )
+    )
+
+
+def variant_urls(recipe, request=None):
+    """URL вариантов картинки: {вариант: {формат: url}}."""
+    build_url = request.build_absolute_uri if request else str
+    return {
+        variant: {
+            extension: build_url(default_storage.url(name))
+            for extension, name in formats.items()
+        }
+        for variant, formats in (recipe.image_variants or {}).items()
+    }
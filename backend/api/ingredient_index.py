@@ -0,0 +1,63 @@
+from bisect import bisect_left
+from threading import Lock
+
+from .models import Ingredient
+from .versions import INGREDIENTS_VERSION, get_version
+
+_index = None
+_lock = Lock()
+
+
+class IngredientIndex:
+    """Отсортированный по нижнему регистру индекс названий.
+
+    Поиск по началу названия - bisect и проход по соседним ключам, то же
+    условие, что lower(name) LIKE 'запрос%' в IngredientFilter. Найденное
+    отдаётся в порядке ingredients, как из базы.
+    """
+
+    def __init__(self, ingredients, version=None):
+        self.version = version
+        self.ingredients = list(ingredients)
+        self.by_id = {
+            ingredient["id"]: ingredient for ingredient in self.ingredients
+        }
+        entries = sorted(
+            (ingredient["name"].lower(), position)
+            for position, ingredient in enumerate(self.ingredients)
+        )
+        self.keys = [key for key, _ in entries]
+        self.positions = [position for _, position in entries]
+
+    def search(self, query, limit=None):
+        query = query.lower()
+        start = end = bisect_left(self.keys, query)
+        while end < len(self.keys) and self.keys[end].startswith(query):
+            end += 1
+        positions = sorted(self.positions[start:end])[:limit]
+        return [self.ingredients[position] for position in positions]
+
+    def all(self, limit=None):
+        return self.ingredients[:limit]
+
+
+def load_index(version):
+    return IngredientIndex(
+        Ingredient.objects.order_by("name", "measurement_unit").values(
+            "id", "name", "measurement_unit"
+        ),
+        version,
+    )
+
+
+def get_index():
+    """Индекс процесса, перестраивается при смене версии."""
+    global _index
+    version = get_version(INGREDIENTS_VERSION)
+    index = _index
+    if index is not None and index.version == version:
+        return index
+    with _lock:
+        if _index is None or _index.version != version:
+            _index = load_index(version)
+        return _index
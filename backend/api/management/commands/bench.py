@@ -0,0 +1,275 @@
+import json
+import statistics
+import time
+
+from api import urls as api_urls
+from api.models import Recipe, User
+from api.serializers import (
+    CompiledReadMixin,
+    RecipeSerializer,
+    TinyRecipeSerializer,
+)
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver, reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+# GET /users/{id}/subscribe/ не обрабатывается, подписка только POST/DELETE.
+SKIP = {"CurrentUserViewSet.subscribe"}
+# Потолок запросов к БД при прогретом кеше токенов, не зависит от страницы.
+QUERY_LIMITS = {
+    "CurrentUserViewSet.list": 2,
+    "CurrentUserViewSet.retrieve": 1,
+    "CurrentUserViewSet.me": 0,
+}
+
+
+def percentile(quantiles, value):
+    return round(quantiles[value - 1] * 1000, 3)
+
+
+def default_host():
+    return next(
+        (host.lstrip(".") for host in settings.ALLOWED_HOSTS if host != "*"),
+        "localhost",
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет GET-эндпоинты роутера API в процессе и выводит "
+        "p50/p95/p99 и число запросов к БД в JSON"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=50)
+        parser.add_argument("--warmup", type=int, default=3)
+        parser.add_argument(
+            "--user",
+            help="email пользователя для авторизованных замеров",
+        )
+        parser.add_argument(
+            "--anonymous",
+            action="store_true",
+            help="Замерять без авторизации",
+        )
+        parser.add_argument(
+            "--serializers",
+            action="store_true",
+            help=(
+                "Сверить быстрый путь сериализаторов рецептов с DRF "
+                "и замерить оба"
+            ),
+        )
+        parser.add_argument("--output", help="Файл для результата")
+        parser.add_argument("--baseline", help="Файл прошлого результата")
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.2,
+            help="Допустимый рост p95 относительно baseline, доля",
+        )
+
+    def handle(self, *args, **options):
+        if options["serializers"]:
+            results = self.measure_serializers(
+                self.user(options), options["requests"]
+            )
+            over_limit = 0
+        else:
+            client = self.client(options)
+            results = {}
+            for name, url in self.endpoints():
+                if name in SKIP:
+                    continue
+                results[name] = self.measure(
+                    client, url, options["requests"], options["warmup"]
+                )
+            over_limit = self.check_limits(results)
+        report = json.dumps(results, ensure_ascii=False, indent=2)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as file:
+                file.write(report)
+        else:
+            self.stdout.write(report)
+        if over_limit:
+            raise CommandError(f"Превышен потолок запросов: {over_limit}")
+        if options["baseline"]:
+            with open(options["baseline"], encoding="utf-8") as file:
+                baseline = json.load(file)
+            regressions = self.compare(
+                baseline, results, options["threshold"]
+            )
+            if regressions:
+                raise CommandError(f"Регрессий: {regressions}")
+            self.stdout.write(self.style.SUCCESS("Регрессий нет"))
+
+    @staticmethod
+    def user(options):
+        if options["anonymous"]:
+            return AnonymousUser()
+        if options["user"]:
+            user = User.objects.get(email=options["user"])
+        else:
+            user = User.objects.filter(is_active=True).order_by(
+                "-recipes_count", "pk"
+            ).first()
+        if user is None:
+            raise CommandError("Нет пользователей, запустите seed_synthetic")
+        return user
+
+    def client(self, options):
+        client = APIClient(HTTP_HOST=default_host())
+        user = self.user(options)
+        if user.is_authenticated:
+            token, _ = Token.objects.get_or_create(user=user)
+            client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+        return client
+
+    @staticmethod
+    def endpoints():
+        """Имена ViewSet.action и URL для всех GET-маршрутов роутера."""
+        # Имена маршрутов пересекаются с роутером djoser, поэтому URL
+        # строится внутри api.urls и дописывается к префиксу его include.
+        root = next(
+            f"/{pattern.pattern}" for pattern in get_resolver().url_patterns
+            if getattr(pattern, "urlconf_name", None) is api_urls
+        )
+        for prefix, viewset, basename in api_urls.router.registry:
+            lookup = viewset.lookup_url_kwarg or viewset.lookup_field
+            sample = viewset.queryset.order_by("pk").values_list(
+                "pk", flat=True
+            ).first()
+            for route in api_urls.router.get_routes(viewset):
+                # У MethodMapper метод get() - декоратор, а не dict.get.
+                action = route.mapping["get"] if "get" in route.mapping else None
+                if action is None or not hasattr(viewset, action):
+                    continue
+                kwargs = {}
+                if "{lookup}" in route.url:
+                    if sample is None:
+                        continue
+                    kwargs[lookup] = sample
+                name = route.name.format(basename=basename)
+                yield (
+                    f"{viewset.__name__}.{action}",
+                    root + reverse(
+                        name, urlconf="api.urls", kwargs=kwargs
+                    ).lstrip("/"),
+                )
+
+    @staticmethod
+    def measure(client, url, requests, warmup):
+        for _ in range(warmup):
+            client.get(url)
+        timings = []
+        queries = []
+        for _ in range(requests):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = client.get(url)
+                timings.append(time.perf_counter() - started)
+            queries.append(len(captured))
+        quantiles = statistics.quantiles(
+            timings, n=100, method="inclusive"
+        ) if len(timings) > 1 else timings * 99
+        return {
+            "url": url,
+            "status": response.status_code,
+            "p50_ms": percentile(quantiles, 50),
+            "p95_ms": percentile(quantiles, 95),
+            "p99_ms": percentile(quantiles, 99),
+            "queries": max(queries),
+        }
+
+    @staticmethod
+    def measure_serializers(user, requests):
+        """Страница рецептов через быстрый путь и через поля DRF.
+
+        JSON обоих путей должен совпадать байт в байт.
+        """
+        request = Request(
+            APIRequestFactory().get("/api/recipes/", HTTP_HOST=default_host())
+        )
+        request.user = user
+        recipes = list(
+            Recipe.objects.for_feed(user)[:settings.REST_FRAMEWORK["PAGE_SIZE"]]
+        )
+        if not recipes:
+            raise CommandError("Нет рецептов, запустите seed_synthetic")
+        renderer = JSONRenderer()
+        results = {}
+        for serializer_class in (RecipeSerializer, TinyRecipeSerializer):
+            serializer = serializer_class(context={"request": request})
+            paths = {
+                "compiled": serializer.to_representation,
+                "drf": super(
+                    CompiledReadMixin, serializer
+                ).to_representation,
+            }
+            rendered = {
+                name: renderer.render([represent(r) for r in recipes])
+                for name, represent in paths.items()
+            }
+            if rendered["compiled"] != rendered["drf"]:
+                raise CommandError(
+                    f"{serializer_class.__name__}: быстрый путь "
+                    "расходится с DRF"
+                )
+            result = {}
+            for name, represent in paths.items():
+                timings = []
+                for _ in range(requests):
+                    started = time.perf_counter()
+                    for recipe in recipes:
+                        represent(recipe)
+                    timings.append(time.perf_counter() - started)
+                result[f"{name}_ms"] = round(
+                    statistics.median(timings) * 1000, 3
+                )
+            result["speedup"] = round(
+                result["drf_ms"] / result["compiled_ms"], 1
+            )
+            results[serializer_class.__name__] = result
+        return results
+
+    def check_limits(self, results):
+        over_limit = 0
+        for name, limit in QUERY_LIMITS.items():
+            result = results.get(name)
+            if result is not None and result["queries"] > limit:
+                over_limit += 1
+                self.stderr.write(
+                    f"{name}: запросов {result['queries']}, потолок {limit}"
+                )
+        return over_limit
+
+    def compare(self, baseline, results, threshold):
+        regressions = 0
+        for name, result in results.items():
+            before = baseline.get(name)
+            if before is None:
+                continue
+            problems = []
+            if result["p95_ms"] > before["p95_ms"] * (1 + threshold):
+                problems.append(
+                    f"p95 {before['p95_ms']} -> {result['p95_ms']} мс"
+                )
+            if result["queries"] > before["queries"]:
+                problems.append(
+                    f"запросов {before['queries']} -> {result['queries']}"
+                )
+            if result["status"] != before["status"]:
+                problems.append(
+                    f"статус {before['status']} -> {result['status']}"
+                )
+            if problems:
+                regressions += 1
+                self.stderr.write(f"{name}: {', '.join(problems)}")
+        return regressions
@@ -0,0 +1,35 @@
+from concurrent.futures import as_completed
+
+from api.images import get_executor, process_recipe_image
+from api.models import Recipe
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Строит уменьшенные картинки для рецептов из media/recipes/"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Пересобрать и уже обработанные картинки",
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image="")
+        if not options["all"]:
+            recipes = recipes.filter(image_variants={})
+        executor = get_executor()
+        futures = [
+            executor.submit(process_recipe_image, recipe_id, image_name)
+            for recipe_id, image_name in recipes.values_list(
+                "id", "image"
+            ).iterator()
+        ]
+        failed = 0
+        for future in as_completed(futures):
+            if future.exception() is not None:
+                failed += 1
+        self.stdout.write(
+            f"Обработано: {len(futures) - failed}, с ошибками: {failed}"
+        )
@@ -1,24 +1,159 @@
+import csv
+import io
 import json
 import os
+import time
+from itertools import islice
 
 from api.models import Ingredient
-from django.core.management.base import BaseCommand
-from django.db import IntegrityError
+from api.versions import INGREDIENTS_VERSION, bump_version
 from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.transaction import atomic
+
+FORMATS = ("json", "csv")
+READ_SIZE = 64 * 1024
+
+
+def read_json(file):
+    """Построчно отдаёт объекты из JSON-массива, не читая файл целиком."""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    started = False
+    for chunk in iter(lambda: file.read(READ_SIZE), ""):
+        buffer += chunk
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if not started and position < len(buffer):
+                if buffer[position] != "[":
+                    raise CommandError("Ожидается JSON-массив")
+                started = True
+                position += 1
+                continue
+            if position < len(buffer) and buffer[position] == "]":
+                return
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                break
+            yield item["name"], item["measurement_unit"]
+        buffer = buffer[position:]
+    if buffer.strip():
+        raise CommandError("Файл JSON обрывается")
+
+
+def read_csv(file):
+    for row in csv.reader(file):
+        if row:
+            yield row[0], row[1]
+
+
+def batches(rows, batch_size):
+    rows = iter(rows)
+    while batch := list(islice(rows, batch_size)):
+        yield batch
 
 
 class Command(BaseCommand):
+    help = "Загружает ингредиенты из JSON или CSV, пропуская существующие"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path",
+            nargs="?",
+            default=os.path.join(settings.BASE_DIR, "data", "ingredients.json"),
+        )
+        parser.add_argument("--format", choices=FORMATS)
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Только посчитать новые записи",
+        )
+
     def handle(self, *args, **options):
-        json_dir = os.path.join(settings.BASE_DIR, 'data')
-        json_file = os.path.join(json_dir, 'ingredients.json')
-        with open(json_file) as f:
-            data = json.loads(f.read())
-        imported = []
-        for ingredient in data:
-            try:
-                Ingredient.objects.create(
-                    name=ingredient["name"],
-                    measurement_unit=ingredient["measurement_unit"],
+        path = options["path"]
+        file_format = options["format"] or os.path.splitext(path)[1][1:]
+        if file_format not in FORMATS:
+            raise CommandError(f"Неизвестный формат: {file_format}")
+        reader = read_json if file_format == "json" else read_csv
+        started = time.monotonic()
+        with open(path, encoding="utf-8", newline="") as file:
+            rows = reader(file)
+            if options["dry_run"]:
+                total, inserted = self.count_new(rows, options["batch_size"])
+            elif connection.vendor == "postgresql":
+                total, inserted = self.copy(rows, options["batch_size"])
+            else:
+                total, inserted = self.insert(rows, options["batch_size"])
+        if inserted and not options["dry_run"]:
+            bump_version(INGREDIENTS_VERSION)
+        self.stdout.write(
+            f"{'Новых' if options['dry_run'] else 'Добавлено'}: {inserted}, "
+            f"пропущено: {total - inserted}, "
+            f"время: {time.monotonic() - started:.2f} с"
+        )
+
+    @staticmethod
+    def count_new(rows, batch_size):
+        total = 0
+        new = set()
+        for batch in batches(rows, batch_size):
+            total += len(batch)
+            existing = set(
+                Ingredient.objects.filter(
+                    name__in=[name for name, _ in batch]
+                ).values_list("name", "measurement_unit")
+            )
+            new.update(row for row in batch if row not in existing)
+        return total, len(new)
+
+    @staticmethod
+    @atomic()
+    def insert(rows, batch_size):
+        total = 0
+        before = Ingredient.objects.count()
+        for batch in batches(rows, batch_size):
+            total += len(batch)
+            Ingredient.objects.bulk_create(
+                [
+                    Ingredient(name=name, measurement_unit=unit)
+                    for name, unit in batch
+                ],
+                ignore_conflicts=True,
+            )
+        return total, Ingredient.objects.count() - before
+
+    @staticmethod
+    @atomic()
+    def copy(rows, batch_size):
+        """COPY во временную таблицу и одна вставка с ON CONFLICT."""
+        total = 0
+        table = Ingredient._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE TEMP TABLE ingredient_staging "
+                "(name varchar(200), measurement_unit varchar(200)) "
+                "ON COMMIT DROP"
+            )
+            for batch in batches(rows, batch_size):
+                total += len(batch)
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(batch)
+                buffer.seek(0)
+                cursor.copy_expert(
+                    "COPY ingredient_staging (name, measurement_unit) "
+                    "FROM STDIN WITH (FORMAT csv)",
+                    buffer,
                 )
-            except IntegrityError:
-                imported.append(ingredient["name"])
+            cursor.execute(
+                f"INSERT INTO {table} (name, measurement_unit) "
+                "SELECT DISTINCT name, measurement_unit "
+                "FROM ingredient_staging "
+                "ON CONFLICT (name, measurement_unit) DO NOTHING"
+            )
+            inserted = cursor.rowcount
+        return total, inserted
@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.transaction import atomic
+
+from api.carts import live_totals
+from api.models import CartIngredient
+
+
+class Command(BaseCommand):
+    help = "Пересобирает суммы корзин и сверяет их с рецептами"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Только сверить, ничего не меняя",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        live = self.live()
+        if not options["check"]:
+            self.rebuild(live, options["batch_size"])
+        mismatches = self.compare(live)
+        if mismatches:
+            raise CommandError(f"Расхождений: {mismatches}")
+        self.stdout.write(
+            self.style.SUCCESS(f"Суммы корзин совпадают: {len(live)}")
+        )
+
+    @staticmethod
+    def live():
+        return {
+            (row["user_id"], row["ingredient_id"]): row["total"]
+            for row in live_totals().iterator()
+        }
+
+    @atomic()
+    def rebuild(self, live, batch_size):
+        CartIngredient.objects.all().delete()
+        CartIngredient.objects.bulk_create(
+            (
+                CartIngredient(
+                    user_id=user_id, ingredient_id=ingredient_id, total=total
+                )
+                for (user_id, ingredient_id), total in live.items()
+            ),
+            batch_size=batch_size,
+        )
+
+    def compare(self, live):
+        stored = {
+            (user_id, ingredient_id): total
+            for user_id, ingredient_id, total in
+            CartIngredient.objects.values_list(
+                "user_id", "ingredient_id", "total"
+            ).iterator()
+        }
+        mismatches = 0
+        for key in live.keys() | stored.keys():
+            if live.get(key) != stored.get(key):
+                mismatches += 1
+                self.stderr.write(
+                    f"user={key[0]} ingredient={key[1]}: "
+                    f"{stored.get(key)} != {live.get(key)}"
+                )
+        return mismatches
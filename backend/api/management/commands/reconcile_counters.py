@@ -0,0 +1,26 @@
+from api.counters import COUNTERS, drifted, reconcile
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Сверяет и чинит счётчики избранного, корзин, рецептов и подписок"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Только показать расхождения",
+        )
+
+    def handle(self, *args, **options):
+        for counter in COUNTERS:
+            model, field = counter[:2]
+            if options["check"]:
+                fixed = drifted(*counter).count()
+            else:
+                fixed = reconcile(*counter)
+            self.stdout.write(
+                f"{model.__name__}.{field}: "
+                f"{'расхождений' if options['check'] else 'исправлено'} "
+                f"{fixed}"
+            )
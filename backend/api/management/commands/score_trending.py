@@ -0,0 +1,12 @@
+from api.trending import score_trending
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает популярность рецептов для ?ordering=trending, "
+        "запускается по расписанию"
+    )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Рецептов с оценкой: {score_trending()}")
@@ -0,0 +1,222 @@
+import io
+import random
+import time
+import uuid
+from datetime import timedelta
+
+from api.carts import refresh_cart_totals
+from api.counters import COUNTERS, reconcile
+from api.feed import fill
+from api.models import (
+    Amount,
+    Favorite,
+    Follow,
+    Ingredient,
+    Recipe,
+    Tag,
+    User,
+    UserCart,
+)
+from api.search import update_search_index
+from api.trending import score_trending
+from api.versions import (
+    INGREDIENTS_VERSION,
+    RECIPES_VERSION,
+    TAGS_VERSION,
+    bump_version,
+)
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db.transaction import atomic
+from django.utils import timezone
+from PIL import Image
+
+# Объёмы на единицу --scale.
+USERS = 100
+RECIPES_PER_USER = 5
+FOLLOWS_PER_USER = 10
+FAVORITES_PER_USER = 20
+CARTS_PER_USER = 5
+AMOUNTS_PER_RECIPE = (3, 12)
+TAGS = (
+    ("Завтрак", "#E26C2D", "breakfast"),
+    ("Обед", "#49B64E", "lunch"),
+    ("Ужин", "#8775D2", "dinner"),
+    ("Десерт", "#F9A62B", "dessert"),
+    ("Выпечка", "#C0392B", "bakery"),
+    ("Суп", "#2E86C1", "soup"),
+    ("Салат", "#28B463", "salad"),
+    ("Напиток", "#7D3C98", "drink"),
+)
+IMAGE_NAME = "recipes/synthetic.jpg"
+PASSWORD = "synthetic-password"
+
+
+def placeholder_image():
+    if not default_storage.exists(IMAGE_NAME):
+        output = io.BytesIO()
+        Image.new("RGB", (600, 480), "#E26C2D").save(output, "JPEG")
+        default_storage.save(IMAGE_NAME, ContentFile(output.getvalue()))
+    return IMAGE_NAME
+
+
+class Command(BaseCommand):
+    help = (
+        "Создаёт синтетических пользователей, рецепты, подписки, "
+        "избранное и корзины для нагрузочных замеров"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scale",
+            type=int,
+            default=1,
+            help=f"Множитель объёма: {USERS} пользователей на единицу",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        self.random = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        if not Ingredient.objects.exists():
+            call_command("import_ingredients", stdout=self.stdout)
+        tags = self.tags()
+        with atomic():
+            users = self.users(options["scale"] * USERS)
+            recipes = self.recipes(users, tags)
+            rows = self.relations(users, recipes)
+        self.finish(users, recipes)
+        self.stdout.write(
+            f"Пользователей: {len(users)}, рецептов: {len(recipes)}, "
+            + ", ".join(f"{name}: {count}" for name, count in rows.items())
+            + f", время: {time.monotonic() - started:.2f} с"
+        )
+
+    def tags(self):
+        for name, color, slug in TAGS:
+            Tag.objects.get_or_create(
+                slug=slug, defaults={"name": name, "color": color}
+            )
+        return list(Tag.objects.values_list("pk", flat=True))
+
+    def users(self, count):
+        run = uuid.uuid4().hex[:8]
+        password = make_password(PASSWORD)
+        return User.objects.bulk_create(
+            (
+                User(
+                    username=f"synthetic_{run}_{number}",
+                    email=f"synthetic_{run}_{number}@example.com",
+                    first_name="Тест",
+                    last_name=f"Пользователь {number}",
+                    password=password,
+                )
+                for number in range(count)
+            ),
+            batch_size=self.batch_size,
+        )
+
+    def recipes(self, users, tags):
+        image = placeholder_image()
+        ingredients = list(Ingredient.objects.values_list("pk", flat=True))
+        recipes = Recipe.objects.bulk_create(
+            (
+                Recipe(
+                    author=user,
+                    name=f"Рецепт {user.pk}-{number}",
+                    text=f"Синтетический рецепт {user.username}-{number}",
+                    cooking_time=self.random.randint(5, 240),
+                    image=image,
+                )
+                for user in users
+                for number in range(RECIPES_PER_USER)
+            ),
+            batch_size=self.batch_size,
+        )
+        Amount.objects.bulk_create(
+            (
+                Amount(recipe=recipe, ingredient_id=ingredient, amount=amount)
+                for recipe in recipes
+                for ingredient, amount in zip(
+                    self.random.sample(
+                        ingredients,
+                        self.random.randint(*AMOUNTS_PER_RECIPE),
+                    ),
+                    iter(lambda: self.random.randint(1, 240), None),
+                )
+            ),
+            batch_size=self.batch_size,
+        )
+        Recipe.tags.through.objects.bulk_create(
+            (
+                Recipe.tags.through(recipe_id=recipe.pk, tag_id=tag)
+                for recipe in recipes
+                for tag in self.random.sample(
+                    tags, self.random.randint(1, min(3, len(tags)))
+                )
+            ),
+            batch_size=self.batch_size,
+        )
+        return recipes
+
+    def pick(self, items, count, exclude=None):
+        picked = self.random.sample(items, min(count, len(items)))
+        return [item for item in picked if item is not exclude]
+
+    def added(self, model):
+        """Время добавления в пределах окна популярности."""
+        if model is Follow:
+            return {}
+        return {
+            "created": timezone.now() - timedelta(
+                hours=self.random.uniform(0, settings.TRENDING_WINDOW_HOURS)
+            )
+        }
+
+    def relations(self, users, recipes):
+        rows = {}
+        for model, field, targets, per_user in (
+            (Follow, "author", users, FOLLOWS_PER_USER),
+            (Favorite, "recipe", recipes, FAVORITES_PER_USER),
+            (UserCart, "recipe", recipes, CARTS_PER_USER),
+        ):
+            # ignore_conflicts возвращает все объекты, вставленные
+            # считаются по базе.
+            before = model.objects.count()
+            model.objects.bulk_create(
+                (
+                    model(user=user, **{field: target}, **self.added(model))
+                    for user in users
+                    for target in self.pick(targets, per_user, exclude=user)
+                ),
+                batch_size=self.batch_size,
+                ignore_conflicts=True,
+            )
+            rows[model._meta.verbose_name_plural] = (
+                model.objects.count() - before
+            )
+        return rows
+
+    def finish(self, users, recipes):
+        """bulk_create не шлёт сигналы, поэтому производное считаем здесь."""
+        user_ids = [user.pk for user in users]
+        recipe_ids = [recipe.pk for recipe in recipes]
+        for start in range(0, len(user_ids), self.batch_size):
+            refresh_cart_totals(user_ids[start:start + self.batch_size])
+        for start in range(0, len(recipe_ids), self.batch_size):
+            update_search_index(recipe_ids[start:start + self.batch_size])
+        for counter in COUNTERS:
+            reconcile(*counter)
+        for start in range(0, len(user_ids), self.batch_size):
+            fill(Follow.objects.filter(
+                user_id__in=user_ids[start:start + self.batch_size]
+            ))
+        score_trending()
+        for name in (TAGS_VERSION, INGREDIENTS_VERSION, RECIPES_VERSION):
+            bump_version(name)
@@ -0,0 +1,273 @@
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from threading import Lock
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from foodgram.postgresql_pool.pool import EVENTS as POOL_EVENTS, pool_stats
+
+# Границы корзин гистограмм: секунды для времени, штуки для запросов.
+TIME_BUCKETS = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+PHASES = ("db", "serialize", "render", "view", "total")
+
+_timings = ContextVar("request_timings", default=None)
+
+
+class Timings:
+    """Замеры одного запроса, время в секундах."""
+
+    def __init__(self):
+        self.durations = dict.fromkeys(PHASES, 0.0)
+        self.queries = 0
+        self.active = set()
+
+    def server_timing(self):
+        return ", ".join(
+            f"{phase};dur={self.durations[phase] * 1000:.1f}"
+            + (f';desc="{self.queries} queries"' if phase == "db" else "")
+            for phase in PHASES
+        )
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets + ("+Inf",), self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        yield f"{name}_sum{{{labels}}} {self.sum:.6f}"
+        yield f"{name}_count{{{labels}}} {self.count}"
+
+
+class Registry:
+    """Гистограммы по эндпоинтам, общие для всех потоков процесса."""
+
+    def __init__(self):
+        self.lock = Lock()
+        self.durations = {}
+        self.queries = {}
+
+    def observe(self, endpoint, timings):
+        with self.lock:
+            for phase, duration in timings.durations.items():
+                self.durations.setdefault(
+                    (endpoint, phase), Histogram(TIME_BUCKETS)
+                ).observe(duration)
+            self.queries.setdefault(
+                endpoint, Histogram(QUERY_BUCKETS)
+            ).observe(timings.queries)
+
+    def render(self):
+        lines = [
+            "# HELP foodgram_request_phase_seconds "
+            "Время фаз обработки запроса.",
+            "# TYPE foodgram_request_phase_seconds histogram",
+        ]
+        with self.lock:
+            for (endpoint, phase), histogram in sorted(
+                self.durations.items()
+            ):
+                lines.extend(histogram.lines(
+                    "foodgram_request_phase_seconds",
+                    f'endpoint="{endpoint}",phase="{phase}"',
+                ))
+            lines.extend((
+                "# HELP foodgram_request_db_queries "
+                "Число SQL-запросов на запрос.",
+                "# TYPE foodgram_request_db_queries histogram",
+            ))
+            for endpoint, histogram in sorted(self.queries.items()):
+                lines.extend(histogram.lines(
+                    "foodgram_request_db_queries", f'endpoint="{endpoint}"'
+                ))
+        lines.extend(pool_lines(pool_stats()))
+        return "\n".join(lines) + "\n"
+
+
+def pool_lines(stats):
+    """Состояние пулов соединений foodgram.postgresql_pool."""
+    if not stats:
+        return
+    yield "# HELP foodgram_db_pool_connections Соединения в пуле."
+    yield "# TYPE foodgram_db_pool_connections gauge"
+    for alias, pool in sorted(stats.items()):
+        for state in ("idle", "in_use"):
+            yield (
+                f'foodgram_db_pool_connections{{alias="{alias}",'
+                f'state="{state}"}} {pool[state]}'
+            )
+    yield "# HELP foodgram_db_pool_events_total События пула соединений."
+    yield "# TYPE foodgram_db_pool_events_total counter"
+    for alias, pool in sorted(stats.items()):
+        for event in POOL_EVENTS:
+            yield (
+                f'foodgram_db_pool_events_total{{alias="{alias}",'
+                f'event="{event}"}} {pool[event]}'
+            )
+
+
+registry = Registry()
+
+
+@contextmanager
+def measure(phase):
+    """Добавляет время блока к фазе текущего запроса.
+
+    Вложенные замеры одной фазы не складываются дважды.
+    """
+    timings = _timings.get()
+    if timings is None or phase in timings.active:
+        yield
+        return
+    timings.active.add(phase)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.durations[phase] += time.perf_counter() - started
+        timings.active.discard(phase)
+
+
+def count_queries(execute, sql, params, many, context):
+    timings = _timings.get()
+    if timings is not None:
+        timings.queries += 1
+    with measure("db"):
+        return execute(sql, params, many, context)
+
+
+def endpoint_name(request):
+    """Имя эндпоинта: ViewSet.action для DRF, иначе имя маршрута."""
+    match = request.resolver_match
+    view = match.func
+    if hasattr(view, "cls") and getattr(view, "actions", None):
+        action = view.actions.get(request.method.lower(), "unknown")
+        return f"{view.cls.__name__}.{action}"
+    return match.view_name or match._func_path
+
+
+def install_wrapper(connection):
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_queries)
+
+
+@receiver(connection_created)
+def connection_opened(sender, connection, **kwargs):
+    """Обёртка ставится на каждое соединение.
+
+    Соединения живут в своих потоках, а в async-режиме запросы к базе
+    идут из потоков sync_to_async, поэтому обёртку нельзя повесить
+    только на время запроса в потоке middleware.
+    """
+    install_wrapper(connection)
+
+
+@contextmanager
+def collect():
+    """Собирает замеры запроса, пока открыт блок."""
+    timings = Timings()
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+class ServerTimingMiddleware:
+    """Замеряет запрос и отдаёт заголовок Server-Timing.
+
+    Фаза view заканчивается перед рендерингом ответа, render - время
+    рендеринга, db и serialize идут внутри view.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        for connection in connections.all(initialized_only=True):
+            install_wrapper(connection)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        with collect() as timings:
+            response = self.get_response(request)
+        return self.finish(request, response, timings, started)
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        with collect() as timings:
+            response = await self.get_response(request)
+        return self.finish(request, response, timings, started)
+
+    def finish(self, request, response, timings, started):
+        total = time.perf_counter() - started
+        timings.durations["total"] = total
+        view_started = getattr(request, "_view_started", None)
+        if view_started is not None:
+            render_started = getattr(request, "_render_started", None)
+            timings.durations["view"] = (
+                render_started or started + total
+            ) - view_started
+            if render_started is not None:
+                timings.durations["render"] = (
+                    started + total - render_started
+                )
+        response["Server-Timing"] = timings.server_timing()
+        if request.resolver_match is not None:
+            registry.observe(endpoint_name(request), timings)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        request._render_started = time.perf_counter()
+        return response
+
+
+@lru_cache(maxsize=None)
+def timed_serializer(serializer_class):
+    """Подкласс сериализатора, время to_representation идёт в serialize."""
+
+    class TimedSerializer(serializer_class):
+        def to_representation(self, instance):
+            with measure("serialize"):
+                return super().to_representation(instance)
+
+    TimedSerializer.__name__ = serializer_class.__name__
+    TimedSerializer.__qualname__ = serializer_class.__qualname__
+    TimedSerializer.__module__ = serializer_class.__module__
+    return TimedSerializer
+
+
+class TimedSerializerMixin:
+    """Считает время сериализации ответов во ViewSet."""
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault("context", self.get_serializer_context())
+        return timed_serializer(self.get_serializer_class())(*args, **kwargs)
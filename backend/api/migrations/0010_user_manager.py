@@ -0,0 +1,19 @@
+# Generated by Django 4.2.4 on 2026-10-18 17:02
+
+import api.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0009_tag_color_unique"),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name="user",
+            managers=[
+                ("objects", api.models.FoodgramUserManager()),
+            ],
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 4.2.4 on 2026-10-18 17:06
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_cart_totals(apps, schema_editor):
+    Amount = apps.get_model("api", "Amount")
+    CartIngredient = apps.get_model("api", "CartIngredient")
+    totals = (
+        Amount.objects.values(
+            "ingredient_id", user_id=models.F("recipe__in_user_cart__user")
+        )
+        .annotate(total=models.Sum("amount"))
+        .filter(user_id__isnull=False)
+        .order_by()
+    )
+    CartIngredient.objects.bulk_create(
+        (CartIngredient(**row) for row in totals.iterator()), batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0010_user_manager"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CartIngredient",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("total", models.PositiveIntegerField(verbose_name="Количество")),
+                (
+                    "ingredient",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="in_carts",
+                        to="api.ingredient",
+                        verbose_name="Ингредиент",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="cart_ingredients",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Пользователь",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Ингредиент в корзине",
+                "verbose_name_plural": "Ингредиенты в корзине",
+                "ordering": ("user", "ingredient"),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="cartingredient",
+            constraint=models.UniqueConstraint(
+                fields=("user", "ingredient"), name="unique_ingredient_in_cart"
+            ),
+        ),
+        migrations.RunPython(fill_cart_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations
+
+
+def create_index(apps, schema_editor):
+    # На PostgreSQL LIKE 'префикс%' использует индекс только
+    # с классом операторов varchar_pattern_ops.
+    opclass = (
+        " varchar_pattern_ops"
+        if schema_editor.connection.vendor == "postgresql"
+        else ""
+    )
+    schema_editor.execute(
+        "CREATE INDEX ingredient_lower_name_idx "
+        f"ON api_ingredient ((LOWER(name)){opclass})"
+    )
+
+
+def drop_index(apps, schema_editor):
+    schema_editor.execute("DROP INDEX ingredient_lower_name_idx")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0011_cartingredient"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0013_recipe_pub_date_id_idx"),
+    ]
+
+    operations = [
+        # Индекс автоматической таблицы M2M для EXISTS по выбранным тегам.
+        migrations.RunSQL(
+            "CREATE INDEX recipe_tags_tag_recipe_idx "
+            "ON api_recipe_tags (tag_id, recipe_id)",
+            "DROP INDEX recipe_tags_tag_recipe_idx",
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 4.2.4 on 2026-10-18 17:12
+
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+POSTGRESQL_UPDATE = """
+UPDATE api_recipe r SET search_vector =
+    setweight(to_tsvector(%(config)s, coalesce(r.name, '')), 'A')
+    || setweight(to_tsvector(%(config)s, coalesce((
+        SELECT string_agg(i.name, ' ') FROM api_amount a
+        JOIN api_ingredient i ON i.id = a.ingredient_id
+        WHERE a.recipe_id = r.id
+    ), '')), 'B')
+    || setweight(to_tsvector(%(config)s, coalesce(r.text, '')), 'C')
+"""
+
+SQLITE_FILL = """
+INSERT INTO recipe_search (rowid, name, text, ingredients)
+SELECT r.id, r.name, r.text, COALESCE((
+    SELECT group_concat(i.name, ' ') FROM api_amount a
+    JOIN api_ingredient i ON i.id = a.ingredient_id
+    WHERE a.recipe_id = r.id
+), '') FROM api_recipe r
+"""
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute(
+            "CREATE INDEX recipe_search_vector_idx "
+            "ON api_recipe USING gin (search_vector)"
+        )
+        schema_editor.execute(
+            POSTGRESQL_UPDATE, {"config": settings.SEARCH_CONFIG}
+        )
+    elif vendor == "sqlite":
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE recipe_search "
+            "USING fts5(name, text, ingredients, tokenize = 'unicode61')"
+        )
+        schema_editor.execute(SQLITE_FILL)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute("DROP INDEX recipe_search_vector_idx")
+    elif vendor == "sqlite":
+        schema_editor.execute("DROP TABLE recipe_search")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0015_recipe_image_variants"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
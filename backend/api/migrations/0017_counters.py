@@ -0,0 +1,77 @@
+# Generated by Django 4.2.4 on 2026-10-18 17:18
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+# (модель со счётчиком, поле, модель строк, поле связи в ней).
+COUNTERS = (
+    ("Recipe", "favorites_count", "Favorite", "recipe"),
+    ("Recipe", "in_carts_count", "UserCart", "recipe"),
+    ("User", "recipes_count", "Recipe", "author"),
+    ("User", "followers_count", "Follow", "author"),
+)
+
+
+def fill_counters(apps, schema_editor):
+    for model_name, field, row_model_name, relation in COUNTERS:
+        model = apps.get_model("api", model_name)
+        row_model = apps.get_model("api", row_model_name)
+        model.objects.update(
+            **{
+                field: Coalesce(
+                    models.Subquery(
+                        row_model.objects.filter(**{relation: models.OuterRef("pk")})
+                        .order_by()
+                        .values(relation)
+                        .annotate(count=models.Count("pk"))
+                        .values("count")
+                    ),
+                    models.Value(0),
+                )
+            }
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0016_recipe_search_vector"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="favorites_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="В избранном"
+            ),
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="in_carts_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="В корзинах"
+            ),
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="followers_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Количество подписчиков"
+            ),
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="recipes_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Количество рецептов"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(
+                fields=["-favorites_count", "-pub_date"],
+                name="recipe_favorites_count_idx",
+            ),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
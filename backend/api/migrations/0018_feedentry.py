@@ -0,0 +1,88 @@
+# Generated by Django 4.2.4 on 2026-10-18 17:59
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_feed(apps, schema_editor):
+    follow = apps.get_model("api", "Follow")
+    feed_entry = apps.get_model("api", "FeedEntry")
+    rows = follow.objects.filter(
+        author__followers_count__lt=settings.FEED_FANOUT_MAX_FOLLOWERS,
+        author__recipes__isnull=False,
+    ).values_list("user_id", "author__recipes", "author_id")
+    feed_entry.objects.bulk_create(
+        (
+            feed_entry(user_id=user_id, recipe_id=recipe_id, author_id=author_id)
+            for user_id, recipe_id, author_id in rows.iterator(
+                chunk_size=settings.DB_STREAM_CHUNK_SIZE
+            )
+        ),
+        batch_size=settings.DB_STREAM_CHUNK_SIZE,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0017_counters"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FeedEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "author",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Автор",
+                    ),
+                ),
+                (
+                    "recipe",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="feed_entries",
+                        to="api.recipe",
+                        verbose_name="Рецепт",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="feed_entries",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Подписчик",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Запись ленты",
+                "verbose_name_plural": "Лента",
+                "ordering": ("user", "-recipe"),
+                "indexes": [
+                    models.Index(fields=["user", "author"], name="feed_user_author_idx")
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="feedentry",
+            constraint=models.UniqueConstraint(
+                fields=("user", "recipe"), name="unique_feed_entry"
+            ),
+        ),
+        migrations.RunPython(fill_feed, migrations.RunPython.noop),
+    ]
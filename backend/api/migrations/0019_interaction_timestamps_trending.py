@@ -0,0 +1,93 @@
+# Generated by Django 4.2.4 on 2026-10-18 18:02
+
+from datetime import datetime, timezone
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+# Время добавления старых строк неизвестно: они получают дату вне окна
+# популярности, иначе score_trending счёл бы их новыми.
+HISTORY_CREATED = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0018_feedentry"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TrendingScore",
+            fields=[
+                (
+                    "recipe",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="trending",
+                        serialize=False,
+                        to="api.recipe",
+                        verbose_name="Рецепт",
+                    ),
+                ),
+                ("score", models.FloatField(verbose_name="Оценка")),
+                ("computed", models.DateTimeField(verbose_name="Рассчитано")),
+            ],
+            options={
+                "verbose_name": "Популярность",
+                "verbose_name_plural": "Популярность",
+                "ordering": ("-score",),
+            },
+        ),
+        migrations.AddField(
+            model_name="favorite",
+            name="created",
+            field=models.DateTimeField(
+                default=HISTORY_CREATED,
+                editable=False,
+                verbose_name="Добавлено",
+            ),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name="favorite",
+            name="created",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now,
+                editable=False,
+                verbose_name="Добавлено",
+            ),
+        ),
+        migrations.AddField(
+            model_name="usercart",
+            name="created",
+            field=models.DateTimeField(
+                default=HISTORY_CREATED,
+                editable=False,
+                verbose_name="Добавлено",
+            ),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name="usercart",
+            name="created",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now,
+                editable=False,
+                verbose_name="Добавлено",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="favorite",
+            index=models.Index(fields=["created"], name="favorite_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="usercart",
+            index=models.Index(fields=["created"], name="usercart_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="trendingscore",
+            index=models.Index(fields=["-score"], name="trending_score_idx"),
+        ),
+    ]
@@ -0,0 +1,17 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0019_interaction_timestamps_trending"),
+    ]
+
+    operations = [
+        # EXISTS по тегам коррелирует по recipe_id, его обслуживает
+        # уникальный индекс (recipe_id, tag_id) таблицы M2M.
+        migrations.RunSQL(
+            "DROP INDEX recipe_tags_tag_recipe_idx",
+            "CREATE INDEX recipe_tags_tag_recipe_idx "
+            "ON api_recipe_tags (tag_id, recipe_id)",
+        ),
+    ]
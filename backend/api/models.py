@@ -1,17 +1,98 @@
 from colorfield.fields import ColorField
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models
-from django.db.models.functions import Lower
+from django.db.models import (
+    Exists,
+    OuterRef,
+    Prefetch,
+    Value,
+    Window,
+)
+from django.db.models.functions import Lower, RowNumber
+from django.utils import timezone
 
 MAX_LENGTH = 15
 
 
-class User(AbstractUser):
+class UserQuerySet(models.QuerySet):
+    def with_is_subscribed(self, user):
+        """Аннотирует is_subscribed для текущего пользователя."""
+        if not user.is_authenticated:
+            return self.annotate(is_subscribed=Value(False))
+        return self.annotate(
+            is_subscribed=Exists(
+                Follow.objects.filter(user=user, author=OuterRef("pk"))
+            )
+        )
+
+    def with_recipes_preview(self, recipes_limit=None):
+        """Подгружает первые рецепты авторов.
+
+        Превью всех авторов страницы выбирается одним запросом
+        с ROW_NUMBER() по автору и кладётся в recipes_preview.
+        """
+        recipes = Recipe.objects.all()
+        if recipes_limit is not None:
+            recipes = recipes.annotate(
+                row_number=Window(
+                    RowNumber(),
+                    partition_by="author",
+                    order_by=("-pub_date", "-id"),
+                )
+            ).filter(row_number__lte=recipes_limit)
+        return self.prefetch_related(
+            Prefetch("recipes", queryset=recipes, to_attr="recipes_preview")
+        )
+
+    def subscriptions(self, user, recipes_limit=None):
+        """Авторы, на которых подписан пользователь, с превью рецептов."""
+        return (
+            self.filter(author__user=user)
+            .with_is_subscribed(user)
+            .with_recipes_preview(recipes_limit)
+            .order_by("id")
+        )
+
+
+class CountersMixin:
+    """Счётчики меняются только через F(), save() их не перезаписывает."""
+
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+class FoodgramUserManager(UserManager.from_queryset(UserQuerySet)):
+    pass
+
+
+class User(CountersMixin, AbstractUser):
     email = models.EmailField(
         "email",
         unique=True
     )
+    recipes_count = models.PositiveIntegerField(
+        "Количество рецептов",
+        default=0,
+        editable=False,
+    )
+    followers_count = models.PositiveIntegerField(
+        "Количество подписчиков",
+        default=0,
+        editable=False,
+    )
+
+    objects = FoodgramUserManager()
+    counter_fields = ("recipes_count", "followers_count")
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = (
@@ -54,7 +135,44 @@ class Ingredient(models.Model):
         return self.name[:MAX_LENGTH]
 
 
-class Recipe(models.Model):
+class RecipeQuerySet(models.QuerySet):
+    def with_user_flags(self, user):
+        """Аннотирует is_favorited и is_in_shopping_cart одним запросом."""
+        if not user.is_authenticated:
+            return self.annotate(
+                is_favorited=Value(False),
+                is_in_shopping_cart=Value(False),
+            )
+        return self.annotate(
+            is_favorited=Exists(
+                Favorite.objects.filter(user=user, recipe=OuterRef("pk"))
+            ),
+            is_in_shopping_cart=Exists(
+                UserCart.objects.filter(user=user, recipe=OuterRef("pk"))
+            ),
+        )
+
+    def for_feed(self, user):
+        """Рецепты для ленты: флаги в SQL, связи через prefetch.
+
+        Число запросов не зависит от размера страницы.
+        """
+        return self.with_user_flags(user).defer(
+            "search_vector"
+        ).prefetch_related(
+            Prefetch(
+                "author",
+                queryset=User.objects.with_is_subscribed(user),
+            ),
+            "tags",
+            Prefetch(
+                "recipe_amounts",
+                queryset=Amount.objects.select_related("ingredient"),
+            ),
+        )
+
+
+class Recipe(CountersMixin, models.Model):
     pub_date = models.DateTimeField(auto_now=True)
     author = models.ForeignKey(
         User,
@@ -70,6 +188,23 @@ class Recipe(models.Model):
         verbose_name="Картинка",
         upload_to="recipes/"
     )
+    search_vector = SearchVectorField(null=True, editable=False)
+    favorites_count = models.PositiveIntegerField(
+        "В избранном",
+        default=0,
+        editable=False,
+    )
+    in_carts_count = models.PositiveIntegerField(
+        "В корзинах",
+        default=0,
+        editable=False,
+    )
+    image_variants = models.JSONField(
+        verbose_name="Уменьшенные картинки",
+        default=dict,
+        blank=True,
+        editable=False,
+    )
     text = models.TextField("Рецепт", unique=True)
     ingredients = models.ManyToManyField(
         Ingredient,
@@ -94,7 +229,20 @@ class Recipe(models.Model):
         )
     )
 
+    objects = RecipeQuerySet.as_manager()
+    counter_fields = ("favorites_count", "in_carts_count")
+
     class Meta:
+        indexes = [
+            models.Index(
+                fields=["-pub_date", "-id"],
+                name="recipe_pub_date_id_idx",
+            ),
+            models.Index(
+                fields=["-favorites_count", "-pub_date"],
+                name="recipe_favorites_count_idx",
+            ),
+        ]
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
         ordering = ("-pub_date",)
@@ -192,6 +340,9 @@ class Favorite(models.Model):
         on_delete=models.CASCADE,
         related_name="favorite_by_user",
     )
+    created = models.DateTimeField(
+        "Добавлено", default=timezone.now, editable=False
+    )
 
     class Meta:
         constraints = [
@@ -200,6 +351,9 @@ class Favorite(models.Model):
                 name="unique_recipe_for_user",
             )
         ]
+        indexes = [
+            models.Index(fields=["created"], name="favorite_created_idx"),
+        ]
         verbose_name = "Избранное"
         verbose_name_plural = "Избранное"
         ordering = ("user", "recipe")
@@ -221,6 +375,9 @@ class UserCart(models.Model):
         on_delete=models.CASCADE,
         related_name="in_user_cart",
     )
+    created = models.DateTimeField(
+        "Добавлено", default=timezone.now, editable=False
+    )
 
     class Meta:
         constraints = [
@@ -229,6 +386,9 @@ class UserCart(models.Model):
                 name="unique_recipe_for_user_in_cart",
             )
         ]
+        indexes = [
+            models.Index(fields=["created"], name="usercart_created_idx"),
+        ]
         verbose_name = "Корзина"
         verbose_name_plural = "Корзина"
         ordering = ("user", "recipe")
@@ -237,6 +397,35 @@ class UserCart(models.Model):
         return self.recipe.name[:MAX_LENGTH]
 
 
+class TrendingScore(models.Model):
+    """Популярность рецепта с затуханием по времени.
+
+    Таблицу целиком пересчитывает команда score_trending, рецепты без
+    недавних добавлений в избранное и корзины в ней отсутствуют.
+    """
+
+    recipe = models.OneToOneField(
+        Recipe,
+        verbose_name="Рецепт",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="trending",
+    )
+    score = models.FloatField("Оценка")
+    computed = models.DateTimeField("Рассчитано")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-score"], name="trending_score_idx"),
+        ]
+        verbose_name = "Популярность"
+        verbose_name_plural = "Популярность"
+        ordering = ("-score",)
+
+    def __str__(self):
+        return f"{self.recipe_id} {self.score:.3f}"
+
+
 class Follow(models.Model):
     user = models.ForeignKey(
         User,
@@ -268,3 +457,87 @@ class Follow(models.Model):
 
     def __str__(self):
         return f'{self.user} {self.author}'
+
+
+class FeedEntry(models.Model):
+    """Рецепт в ленте подписчика, fan-out-on-write.
+
+    Строки пишут функции из api.feed при публикации рецепта и при
+    подписке. Рецепты авторов с FEED_FANOUT_MAX_FOLLOWERS и более
+    подписчиков сюда не попадают, лента читает их напрямую.
+    """
+
+    user = models.ForeignKey(
+        User,
+        verbose_name="Подписчик",
+        on_delete=models.CASCADE,
+        related_name="feed_entries",
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        verbose_name="Рецепт",
+        on_delete=models.CASCADE,
+        related_name="feed_entries",
+    )
+    author = models.ForeignKey(
+        User,
+        verbose_name="Автор",
+        on_delete=models.CASCADE,
+        related_name="+",
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "recipe"],
+                name="unique_feed_entry",
+            )
+        ]
+        # Уникальный индекс (user, recipe) читается и в обратном порядке.
+        indexes = [
+            models.Index(
+                fields=["user", "author"], name="feed_user_author_idx"
+            ),
+        ]
+        verbose_name = "Запись ленты"
+        verbose_name_plural = "Лента"
+        ordering = ("user", "-recipe")
+
+    def __str__(self):
+        return f"{self.user_id} {self.recipe_id}"
+
+
+class CartIngredient(models.Model):
+    """Суммарное количество ингредиента в корзине пользователя.
+
+    Поддерживается функциями из api.carts при изменении
+    корзины и ингредиентов рецептов.
+    """
+
+    user = models.ForeignKey(
+        User,
+        verbose_name="Пользователь",
+        on_delete=models.CASCADE,
+        related_name="cart_ingredients",
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        verbose_name="Ингредиент",
+        on_delete=models.CASCADE,
+        related_name="in_carts",
+    )
+    total = models.PositiveIntegerField("Количество")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "ingredient"],
+                name="unique_ingredient_in_cart",
+            )
+        ]
+        verbose_name = "Ингредиент в корзине"
+        verbose_name_plural = "Ингредиенты в корзине"
+        ordering = ("user", "ingredient")
+
+    def __str__(self):
+        return f"{self.user_id} {self.ingredient_id} {self.total}"
@@ -0,0 +1,208 @@
+import json
+from base64 import b64decode, b64encode
+from binascii import Error as BinasciiError
+from functools import reduce
+from operator import or_
+
+from django.db import connections
+from django.db.models import Field, Func, Q, Value
+from django.db.models.lookups import GreaterThan, LessThan
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .feed import feed_recipe_ids
+
+MODE_PARAM = "pagination"
+KEYSET_MODE = "cursor"
+# Базы, где условие курсора - сравнение строк (a, b) < (x, y).
+ROW_COMPARISON_VENDORS = ("postgresql",)
+
+
+class Row(Func):
+    """Конструктор строки (a, b, ...) для сравнения целиком."""
+
+    template = "(%(expressions)s)"
+    output_field = Field()
+
+
+class KeysetPagination(BasePagination):
+    """Пагинация по ключу без COUNT и OFFSET.
+
+    Позиция - значения полей ordering у крайней записи страницы,
+    следующая страница выбирается условием вида
+    (pub_date, id) < (p, i), которое обслуживается составным индексом.
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "limit"
+    max_page_size = 100
+    invalid_cursor_message = "Неверный курсор"
+
+    def __init__(self, ordering, page_size):
+        self.ordering = tuple(ordering)
+        self.page_size = page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request, queryset.model)
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(map(self.invert, ordering))
+        page = self.select(queryset, ordering, position, page_size + 1)
+        has_more = len(page) > page_size
+        page = page[:page_size]
+        if reverse:
+            page.reverse()
+        self.has_next = has_more if not reverse else True
+        self.has_previous = has_more if reverse else position is not None
+        self.page = page
+        return page
+
+    def select(self, queryset, ordering, position, limit):
+        """Первые limit строк после position в порядке ordering."""
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.after(
+                ordering, position, connections[queryset.db].vendor
+            ))
+        return list(queryset[:limit])
+
+    def get_page_size(self, request):
+        limit = request.query_params.get(self.page_size_query_param, "")
+        if limit.isdigit() and int(limit) > 0:
+            return min(int(limit), self.max_page_size)
+        return self.page_size
+
+    @staticmethod
+    def invert(field):
+        return field[1:] if field.startswith("-") else f"-{field}"
+
+    @staticmethod
+    def field_name(field):
+        return field.lstrip("-")
+
+    def after(self, ordering, position, vendor=None):
+        """Условие "строка идёт после position" в порядке ordering.
+
+        Если все поля идут в одном направлении, на PostgreSQL это
+        сравнение строк, которое целиком ограничивает проход по
+        составному индексу. Иначе условие раскрывается через OR.
+        """
+        names = [self.field_name(field) for field in ordering]
+        descending = {field.startswith("-") for field in ordering}
+        if vendor in ROW_COMPARISON_VENDORS and len(descending) == 1:
+            lookup = LessThan if descending.pop() else GreaterThan
+            return lookup(
+                Row(*names), Row(*(Value(position[name]) for name in names))
+            )
+        conditions = []
+        for index, field in enumerate(ordering):
+            lookup = "lt" if field.startswith("-") else "gt"
+            name = self.field_name(field)
+            conditions.append(Q(
+                **{
+                    self.field_name(prefix): position[self.field_name(prefix)]
+                    for prefix in ordering[:index]
+                },
+                **{f"{name}__{lookup}": position[name]},
+            ))
+        return reduce(or_, conditions)
+
+    def decode_cursor(self, request, model):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None, False
+        try:
+            data = json.loads(b64decode(cursor.encode("ascii")))
+            position = {
+                name: model._meta.get_field(name).to_python(value)
+                for name, value in zip(
+                    map(self.field_name, self.ordering), data["p"]
+                )
+            }
+            reverse = bool(data["r"])
+        except (
+            BinasciiError, KeyError, TypeError, UnicodeError, ValueError
+        ) as error:
+            raise NotFound(self.invalid_cursor_message) from error
+        if len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def encode_cursor(self, obj, reverse):
+        values = []
+        for field in map(self.field_name, self.ordering):
+            value = getattr(obj, field)
+            values.append(
+                value.isoformat() if hasattr(value, "isoformat") else value
+            )
+        cursor = b64encode(
+            json.dumps({"p": values, "r": int(reverse)}).encode()
+        ).decode("ascii")
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, cursor
+        )
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(
+                self.base_url, self.cursor_query_param
+            )
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+
+class PageOrKeysetPagination(PageNumberPagination):
+    """Постраничная пагинация, ?pagination=cursor включает курсоры.
+
+    Порядок для курсора задаёт атрибут keyset_ordering у view.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if request.query_params.get(MODE_PARAM) == KEYSET_MODE:
+            self.keyset = KeysetPagination(
+                getattr(view, "keyset_ordering", ("-pk",)),
+                self.page_size,
+            )
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class FeedPagination(KeysetPagination):
+    """Курсоры ленты подписок, порядок - от новых рецептов по id."""
+
+    def __init__(self):
+        super().__init__(("-id",), api_settings.PAGE_SIZE)
+
+    def select(self, queryset, ordering, position, limit):
+        ids = feed_recipe_ids(
+            self.request.user,
+            ordering[0].startswith("-"),
+            position and position["id"],
+            limit,
+        )
+        return list(queryset.filter(pk__in=ids).order_by(*ordering))
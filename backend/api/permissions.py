@@ -1,6 +1,28 @@
+from django.conf import settings
+from django.utils.crypto import constant_time_compare
 from rest_framework.permissions import BasePermission, SAFE_METHODS
 
 
 class RecipeOwner(BasePermission):
     def has_object_permission(self, request, view, obj):
         return (request.method in SAFE_METHODS) or (obj.author == request.user)
+
+
+class MetricsScraper(BasePermission):
+    """Администратор или Prometheus с токеном METRICS_TOKEN.
+
+    Prometheus передаёт токен заголовком Authorization: Bearer <токен>,
+    без METRICS_TOKEN метрики доступны только администраторам.
+    """
+
+    def has_permission(self, request, view):
+        if request.user and request.user.is_staff:
+            return True
+        scheme, _, credentials = request.headers.get(
+            "Authorization", ""
+        ).partition(" ")
+        return (
+            bool(settings.METRICS_TOKEN)
+            and scheme.lower() == "bearer"
+            and constant_time_compare(credentials, settings.METRICS_TOKEN)
+        )
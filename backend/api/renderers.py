@@ -0,0 +1,119 @@
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+from .streaming import streaming_content
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Элементов списка в одном куске потокового ответа.
+STREAM_BATCH_SIZE = 100
+ESCAPED = ((b"\xe2\x80\xa8", b"\\u2028"), (b"\xe2\x80\xa9", b"\\u2029"))
+
+_default = encoders.JSONEncoder().default
+
+
+def escape(content):
+    """\\u2028 и \\u2029 экранируются, как в JSONRenderer."""
+    for raw, escaped in ESCAPED:
+        if raw in content:
+            content = content.replace(raw, escaped)
+    return content
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer на orjson, без него - на стандартном json.
+
+    Вывод совпадает с JSONRenderer: компактные разделители, UTF-8,
+    даты и Decimal через encoders.JSONEncoder. Отступы, ensure_ascii и
+    значения, которые orjson не кодирует, отдаются JSONRenderer.
+    """
+
+    def dumps(self, data):
+        if orjson is None or self.ensure_ascii or not self.compact:
+            return None
+        try:
+            return escape(orjson.dumps(
+                data,
+                default=_default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME
+                | orjson.OPT_NON_STR_KEYS,
+            ))
+        except TypeError:
+            return None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if self.get_indent(accepted_media_type, renderer_context or {}) is None:
+            content = self.dumps(data)
+            if content is not None:
+                return content
+        return super().render(data, accepted_media_type, renderer_context)
+
+    def stream(self, items):
+        """Список по кускам из STREAM_BATCH_SIZE элементов.
+
+        Склеенные куски совпадают с render(items).
+        """
+        yield b"["
+        for start in range(0, len(items), STREAM_BATCH_SIZE):
+            batch = self.render(items[start:start + STREAM_BATCH_SIZE])
+            yield (b"," if start else b"") + batch[1:-1]
+        yield b"]"
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser на orjson для тел в UTF-8."""
+
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace("_", "-") != "utf-8":
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
+
+
+def should_stream(renderer, data, accepted_media_type=None, context=None):
+    return (
+        isinstance(renderer, FastJSONRenderer)
+        and isinstance(data, list)
+        and len(data) >= settings.JSON_STREAM_MIN_ITEMS
+        and renderer.get_indent(accepted_media_type, context or {}) is None
+    )
+
+
+class StreamingJSONMixin:
+    """Большие списки в JSON отдаются потоком, а не одной строкой."""
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        renderer = getattr(response, "accepted_renderer", None)
+        if response.status_code != 200 or not should_stream(
+            renderer,
+            getattr(response, "data", None),
+            response.accepted_media_type,
+            response.renderer_context,
+        ):
+            return response
+        streaming = StreamingHttpResponse(
+            streaming_content(request, renderer.stream(response.data)),
+            content_type=renderer.media_type,
+        )
+        for header, value in response.items():
+            if header != "Content-Type":
+                streaming[header] = value
+        return streaming
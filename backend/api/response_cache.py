@@ -0,0 +1,153 @@
+import asyncio
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from .versions import (
+    INGREDIENTS_VERSION,
+    POPULARITY_VERSION,
+    RECIPES_VERSION,
+    TAGS_VERSION,
+    TRENDING_VERSION,
+    get_versions,
+    recipe_version,
+)
+
+KEY_PREFIX = "response"
+CACHED_HEADERS = ("Content-Type", "Vary", "Allow")
+LOCK_TIMEOUT = 10
+POLL_INTERVAL = 0.05
+
+
+def normalized_query(request):
+    return "&".join(
+        f"{key}={value}"
+        for key, values in sorted(request.GET.lists())
+        for value in sorted(values)
+    )
+
+
+def response_key(request, versions):
+    parts = (
+        request.build_absolute_uri(request.path),
+        normalized_query(request),
+        request.META.get("HTTP_ACCEPT", ""),
+        *map(str, versions),
+    )
+    digest = hashlib.md5("|".join(parts).encode()).hexdigest()
+    return f"{KEY_PREFIX}:{digest}"
+
+
+def to_cached(response):
+    return {
+        "content": response.content,
+        "headers": {
+            header: response[header]
+            for header in CACHED_HEADERS if response.has_header(header)
+        },
+    }
+
+
+def from_cached(cached):
+    return HttpResponse(cached["content"], headers=cached["headers"])
+
+
+def get_or_build(key, build):
+    """Берёт ответ из кеша или строит его.
+
+    Строит ответ только тот, кто первым взял блокировку, остальные
+    ждут его результата до LOCK_TIMEOUT секунд.
+    """
+    cached = cache.get(key)
+    if cached is not None:
+        return from_cached(cached)
+    lock = f"{key}:lock"
+    if not cache.add(lock, 1, LOCK_TIMEOUT):
+        deadline = time.monotonic() + LOCK_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(POLL_INTERVAL)
+            cached = cache.get(key)
+            if cached is not None:
+                return from_cached(cached)
+        return build()
+    try:
+        response = build()
+        if response.status_code == 200 and not response.streaming:
+            cache.set(
+                key, to_cached(response), settings.RESPONSE_CACHE_TIMEOUT
+            )
+        return response
+    finally:
+        cache.delete(lock)
+
+
+async def aget_or_build(key, build):
+    """get_or_build для async-кода, build - корутинная функция."""
+    cached = await cache.aget(key)
+    if cached is not None:
+        return from_cached(cached)
+    lock = f"{key}:lock"
+    if not await cache.aadd(lock, 1, LOCK_TIMEOUT):
+        deadline = time.monotonic() + LOCK_TIMEOUT
+        while time.monotonic() < deadline:
+            await asyncio.sleep(POLL_INTERVAL)
+            cached = await cache.aget(key)
+            if cached is not None:
+                return from_cached(cached)
+        return await build()
+    try:
+        response = await build()
+        if response.status_code == 200 and not response.streaming:
+            await cache.aset(
+                key, to_cached(response), settings.RESPONSE_CACHE_TIMEOUT
+            )
+        return response
+    finally:
+        await cache.adelete(lock)
+
+
+class AnonymousResponseCacheMixin:
+    """Кеш готовых ответов list и retrieve для анонимных запросов.
+
+    Ключ включает нормализованный запрос и версии данных, которые
+    меняются сигналами, поэтому устаревшие ответы не отдаются.
+    """
+
+    cached_actions = ("list", "retrieve")
+
+    def response_cache_versions(self, request, action, kwargs):
+        names = [TAGS_VERSION, INGREDIENTS_VERSION]
+        if action == "retrieve":
+            names.append(recipe_version(kwargs.get(self.lookup_field)))
+        else:
+            names.append(RECIPES_VERSION)
+        ordering = request.GET.get("ordering")
+        if ordering == "popular":
+            names.append(POPULARITY_VERSION)
+        elif ordering == "trending":
+            names.append(TRENDING_VERSION)
+        return get_versions(names)
+
+    def dispatch(self, request, *args, **kwargs):
+        action = self.action_map.get(request.method.lower())
+        if (
+            action not in self.cached_actions
+            or "HTTP_AUTHORIZATION" in request.META
+        ):
+            return super().dispatch(request, *args, **kwargs)
+
+        def build():
+            response = super(AnonymousResponseCacheMixin, self).dispatch(
+                request, *args, **kwargs
+            )
+            if hasattr(response, "render"):
+                response.render()
+            return response
+
+        key = response_key(
+            request, self.response_cache_versions(request, action, kwargs)
+        )
+        return get_or_build(key, build)
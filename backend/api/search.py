@@ -0,0 +1,130 @@
+import re
+from threading import local
+
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+)
+from django.db import connection, transaction
+from django.db.models import F, FloatField, OuterRef, Q, Subquery, Value
+from django.db.models.expressions import RawSQL
+
+from .models import Amount, Recipe
+
+FTS_TABLE = "recipe_search"
+# Веса bm25 для колонок name, text, ingredients.
+FTS_WEIGHTS = "10.0, 1.0, 5.0"
+
+_pending = local()
+
+
+def is_postgresql():
+    return connection.vendor == "postgresql"
+
+
+def is_sqlite():
+    return connection.vendor == "sqlite"
+
+
+def update_search_index(recipe_ids):
+    """Пересчитывает поисковый индекс для рецептов recipe_ids."""
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return
+    if is_postgresql():
+        ingredient_names = Amount.objects.filter(
+            recipe=OuterRef("pk")
+        ).values("recipe").annotate(
+            names=StringAgg("ingredient__name", delimiter=" ")
+        ).values("names")
+        config = settings.SEARCH_CONFIG
+        Recipe.objects.filter(pk__in=recipe_ids).update(
+            search_vector=(
+                SearchVector("name", weight="A", config=config)
+                + SearchVector(
+                    Subquery(ingredient_names), weight="B", config=config
+                )
+                + SearchVector("text", weight="C", config=config)
+            )
+        )
+    elif is_sqlite():
+        placeholders = ", ".join(["%s"] * len(recipe_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})",
+                recipe_ids,
+            )
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, name, text, ingredients) "
+                "SELECT r.id, r.name, r.text, COALESCE(("
+                "  SELECT group_concat(i.name, ' ') FROM api_amount a"
+                "  JOIN api_ingredient i ON i.id = a.ingredient_id"
+                "  WHERE a.recipe_id = r.id"
+                "), '') FROM api_recipe r "
+                f"WHERE r.id IN ({placeholders})",
+                recipe_ids,
+            )
+
+
+def flush_search_index():
+    recipe_ids = getattr(_pending, "recipe_ids", None)
+    _pending.recipe_ids = set()
+    if recipe_ids:
+        update_search_index(recipe_ids)
+
+
+def schedule_search_update(recipe_id):
+    """Обновляет индекс рецепта после коммита транзакции.
+
+    Изменения нескольких строк Amount одного рецепта в транзакции
+    дают одно обновление индекса.
+    """
+    if not hasattr(_pending, "recipe_ids"):
+        _pending.recipe_ids = set()
+    _pending.recipe_ids.add(recipe_id)
+    transaction.on_commit(flush_search_index)
+
+
+def fts_query(query):
+    """Запрос FTS5 из слов пользователя, каждое слово как префикс."""
+    return " ".join(f'"{word}"*' for word in re.findall(r"\w+", query))
+
+
+def search_recipes(queryset, query):
+    """Фильтрует рецепты по запросу и аннотирует search_rank.
+
+    Чем больше search_rank, тем лучше совпадение.
+    """
+    if is_postgresql():
+        search_query = SearchQuery(
+            query, config=settings.SEARCH_CONFIG, search_type="websearch"
+        )
+        return queryset.filter(search_vector=search_query).annotate(
+            search_rank=SearchRank(F("search_vector"), search_query)
+        )
+    if is_sqlite():
+        match = fts_query(query)
+        if not match:
+            return queryset.none()
+        return queryset.filter(
+            pk__in=RawSQL(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s",
+                (match,),
+            )
+        ).annotate(
+            search_rank=RawSQL(
+                f"SELECT -bm25({FTS_TABLE}, {FTS_WEIGHTS}) FROM {FTS_TABLE} "
+                f"WHERE {FTS_TABLE} MATCH %s "
+                f"AND {FTS_TABLE}.rowid = {Recipe._meta.db_table}.id",
+                (match,),
+                output_field=FloatField(),
+            )
+        )
+    return queryset.filter(
+        Q(name__icontains=query)
+        | Q(text__icontains=query)
+        | Q(ingredients__name__icontains=query)
+    ).distinct().annotate(search_rank=Value(0.0))
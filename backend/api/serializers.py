@@ -6,7 +6,11 @@ from django.db.models import F
 from djoser.serializers import UserCreateSerializer
 from drf_extra_fields.fields import Base64ImageField
 
+from .carts import refresh_recipe_carts
+from .images import schedule_variants, variant_urls
+from .search import schedule_search_update
 from .models import (
+    CartIngredient,
     Ingredient,
     Recipe,
     Tag,
@@ -39,6 +43,8 @@ class CurrentUserSerializer(serializers.ModelSerializer):
     is_subscribed = serializers.SerializerMethodField()
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, "is_subscribed"):
+            return obj.is_subscribed
         current_user = self.context.get("request").user
         return current_user.is_authenticated and Follow.objects.filter(
             user=current_user, author=obj).exists()
@@ -55,14 +61,52 @@ class CurrentUserSerializer(serializers.ModelSerializer):
         )
 
 
-class TinyRecipeSerializer(serializers.ModelSerializer):
+def image_url(image, request):
+    """URL картинки как у Base64ImageField с UPLOADED_FILES_USE_URL."""
+    if not image:
+        return None
+    if request is not None:
+        return request.build_absolute_uri(image.url)
+    return image.url
+
+
+class CompiledReadMixin:
+    """Быстрое чтение: dict собирается без полей DRF.
+
+    represent() возвращает None, если объекту не хватает аннотаций или
+    prefetch, тогда ответ строит обычный to_representation. Результат
+    обоих путей одинаков, проверка - manage.py bench --serializers.
+    """
+
+    def to_representation(self, instance):
+        data = self.represent(instance, self.context.get("request"))
+        if data is None:
+            return super().to_representation(instance)
+        return data
+
+
+class TinyRecipeSerializer(CompiledReadMixin, serializers.ModelSerializer):
     image = Base64ImageField()
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
-        fields = ("id", "name", "image", "cooking_time")
+        fields = ("id", "name", "image", "image_variants", "cooking_time")
         read_only_fields = ("id", "name", "image", "cooking_time")
 
+    def get_image_variants(self, obj):
+        return variant_urls(obj, self.context.get("request"))
+
+    @staticmethod
+    def represent(recipe, request):
+        return {
+            "id": recipe.id,
+            "name": recipe.name,
+            "image": image_url(recipe.image, request),
+            "image_variants": variant_urls(recipe, request),
+            "cooking_time": recipe.cooking_time,
+        }
+
 
 class RecipeIngredientSerializer(serializers.ModelSerializer):
     id = serializers.IntegerField(source="ingredient.id")
@@ -76,8 +120,9 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
         fields = ("id", "name", "measurement_unit", "amount")
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(CompiledReadMixin, serializers.ModelSerializer):
     image = Base64ImageField()
+    image_variants = serializers.SerializerMethodField()
     tags = TagSerializer(read_only=True, many=True)
     author = CurrentUserSerializer(read_only=True)
     is_favorited = serializers.SerializerMethodField()
@@ -87,20 +132,78 @@ class RecipeSerializer(serializers.ModelSerializer):
     )
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, "is_favorited"):
+            return obj.is_favorited
         current_user = self.context.get("request").user
         return current_user.is_authenticated and Favorite.objects.filter(
             user=current_user, recipe=obj).exists()
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, "is_in_shopping_cart"):
+            return obj.is_in_shopping_cart
         current_user = self.context.get("request").user
         return current_user.is_authenticated and UserCart.objects.filter(
             user=current_user, recipe=obj).exists()
 
+    def get_image_variants(self, obj):
+        return variant_urls(obj, self.context.get("request"))
+
     def get_ingredients(self, obj):
         return obj.ingredients.values(
             "id", "name", "measurement_unit", amount=F("ingredients__amount")
         )
 
+    @staticmethod
+    def represent(recipe, request):
+        """Рецепт из Recipe.objects.for_feed()."""
+        prefetched = getattr(recipe, "_prefetched_objects_cache", {})
+        if (
+            "tags" not in prefetched
+            or "recipe_amounts" not in prefetched
+            or not Recipe.author.is_cached(recipe)
+            or not hasattr(recipe.author, "is_subscribed")
+            or not hasattr(recipe, "is_favorited")
+            or not hasattr(recipe, "is_in_shopping_cart")
+        ):
+            return None
+        author = recipe.author
+        return {
+            "id": recipe.id,
+            "tags": [
+                {
+                    "id": tag.id,
+                    "name": tag.name,
+                    "color": tag.color,
+                    "slug": tag.slug,
+                }
+                for tag in prefetched["tags"]
+            ],
+            "author": {
+                "email": author.email,
+                "id": author.id,
+                "username": author.username,
+                "first_name": author.first_name,
+                "last_name": author.last_name,
+                "is_subscribed": author.is_subscribed,
+            },
+            "ingredients": [
+                {
+                    "id": amount.ingredient.id,
+                    "name": amount.ingredient.name,
+                    "measurement_unit": amount.ingredient.measurement_unit,
+                    "amount": amount.amount,
+                }
+                for amount in prefetched["recipe_amounts"]
+            ],
+            "is_favorited": recipe.is_favorited,
+            "is_in_shopping_cart": recipe.is_in_shopping_cart,
+            "name": recipe.name,
+            "image": image_url(recipe.image, request),
+            "image_variants": variant_urls(recipe, request),
+            "text": recipe.text,
+            "cooking_time": recipe.cooking_time,
+        }
+
     def validate_ingredients(self, ingredients):
         if len(ingredients) == 0:
             raise serializers.ValidationError(
@@ -144,6 +247,45 @@ class RecipeSerializer(serializers.ModelSerializer):
             ))
         Amount.objects.bulk_create(new_ingredients)
 
+    @staticmethod
+    def update_ingredients(ingredients, recipe):
+        """Приводит строки Amount к списку ингредиентов.
+
+        Пишутся только новые, изменённые и удалённые строки. Возвращает
+        True, если ингредиенты рецепта изменились.
+        """
+        amounts = {
+            ingredient["ingredient"]["id"]: ingredient["amount"]
+            for ingredient in ingredients
+        }
+        existing = {
+            amount.ingredient_id: amount
+            for amount in recipe.recipe_amounts.all()
+        }
+        removed = [
+            amount.pk for ingredient_id, amount in existing.items()
+            if ingredient_id not in amounts
+        ]
+        changed = []
+        added = []
+        for ingredient_id, value in amounts.items():
+            amount = existing.get(ingredient_id)
+            if amount is None:
+                added.append(Amount(
+                    recipe=recipe, ingredient_id=ingredient_id, amount=value
+                ))
+            elif amount.amount != value:
+                amount.amount = value
+                changed.append(amount)
+        if removed:
+            # post_delete строк сам пересчитывает корзины по этим ингредиентам.
+            Amount.objects.filter(pk__in=removed).delete()
+        if changed:
+            Amount.objects.bulk_update(changed, ["amount"])
+        if added:
+            Amount.objects.bulk_create(added)
+        return bool(changed or added)
+
     @atomic()
     def create(self, context):
         ingredients = context.pop("recipe_amounts")
@@ -151,16 +293,28 @@ class RecipeSerializer(serializers.ModelSerializer):
         recipe = Recipe.objects.create(**context)
         recipe.tags.set(tags)
         self.create_ingredients(ingredients, recipe)
+        schedule_search_update(recipe.id)
+        schedule_variants(recipe)
         return recipe
 
     @atomic()
     def update(self, recipe, data):
-        ingredients = data.pop("recipe_amounts")
-        tags = data.pop("tags")
+        ingredients = data.pop("recipe_amounts", None)
+        tags = data.pop("tags", None)
+        if "image" in data:
+            data["image_variants"] = {}
         super().update(recipe, data)
-        recipe.tags.set(tags)
-        recipe.recipe_amounts.all().delete()
-        self.create_ingredients(ingredients, recipe)
+        if "image" in data:
+            schedule_variants(recipe)
+        if tags is not None:
+            # set() сравнивает с текущими тегами и пишет только разницу.
+            recipe.tags.set(tags)
+        if ingredients is not None and self.update_ingredients(
+            ingredients, recipe
+        ):
+            # bulk_create и bulk_update не шлют сигналы Amount.
+            refresh_recipe_carts(recipe.id)
+            schedule_search_update(recipe.id)
         return recipe
 
     class Meta:
@@ -174,6 +328,7 @@ class RecipeSerializer(serializers.ModelSerializer):
             "is_in_shopping_cart",
             "name",
             "image",
+            "image_variants",
             "text",
             "cooking_time",
         )
@@ -199,6 +354,19 @@ class RecipeCreateSerializer(RecipeSerializer):
         return RecipeSerializer(instance, context=self.context).data
 
 
+class CartIngredientSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source="ingredient.id")
+    name = serializers.CharField(source="ingredient.name")
+    measurement_unit = serializers.CharField(
+        source="ingredient.measurement_unit"
+    )
+    amount = serializers.IntegerField(source="total")
+
+    class Meta:
+        model = CartIngredient
+        fields = ("id", "name", "measurement_unit", "amount")
+
+
 class UserCartSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserCart
@@ -207,7 +375,6 @@ class UserCartSerializer(serializers.ModelSerializer):
 
 class FollowSerializer(CurrentUserSerializer):
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
 
     class Meta:
         model = User
@@ -223,6 +390,8 @@ class FollowSerializer(CurrentUserSerializer):
         )
 
     def get_recipes(self, obj):
+        if hasattr(obj, "recipes_preview"):
+            return TinyRecipeSerializer(obj.recipes_preview, many=True).data
         request = self.context.get("request")
         recipes_limit = request.GET.get("recipes_limit")
         queryset = Recipe.objects.filter(author=obj)
@@ -230,9 +399,6 @@ class FollowSerializer(CurrentUserSerializer):
             queryset = queryset[: int(recipes_limit)]
         return TinyRecipeSerializer(queryset, many=True).data
 
-    def get_recipes_count(self, obj):
-        return Recipe.objects.filter(author=obj).count()
-
 
 class CurrentUserCreateSerializer(UserCreateSerializer):
     email = serializers.EmailField(
@@ -0,0 +1,165 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from . import carts, feed
+from .authentication import invalidate_tokens
+from .counters import change_counter
+from .models import (
+    Amount,
+    Favorite,
+    Follow,
+    Ingredient,
+    Recipe,
+    Tag,
+    User,
+    UserCart,
+)
+from .search import schedule_search_update
+from .versions import (
+    INGREDIENTS_VERSION,
+    POPULARITY_VERSION,
+    RECIPES_VERSION,
+    TAGS_VERSION,
+    bump_versions_on_commit,
+    recipe_version,
+)
+
+# Поля пользователя, которые попадают в ответы с рецептами.
+USER_PUBLIC_FIELDS = {"email", "username", "first_name", "last_name"}
+
+
+def recipe_output_changed(*recipe_ids):
+    bump_versions_on_commit(
+        RECIPES_VERSION, *map(recipe_version, recipe_ids)
+    )
+
+
+@receiver(post_save, sender=UserCart)
+def cart_recipe_added(sender, instance, created, **kwargs):
+    if created:
+        carts.recipe_added(instance.user_id, instance.recipe_id)
+        change_counter(Recipe, "in_carts_count", instance.recipe_id, 1)
+
+
+@receiver(post_delete, sender=UserCart)
+def cart_recipe_removed(sender, instance, **kwargs):
+    carts.recipe_removed(instance.user_id)
+    change_counter(Recipe, "in_carts_count", instance.recipe_id, -1)
+
+
+@receiver(post_save, sender=Favorite)
+def favorite_added(sender, instance, created, **kwargs):
+    if created:
+        change_counter(Recipe, "favorites_count", instance.recipe_id, 1)
+        bump_versions_on_commit(POPULARITY_VERSION)
+
+
+@receiver(post_delete, sender=Favorite)
+def favorite_removed(sender, instance, **kwargs):
+    change_counter(Recipe, "favorites_count", instance.recipe_id, -1)
+    bump_versions_on_commit(POPULARITY_VERSION)
+
+
+@receiver(post_save, sender=Follow)
+def follow_added(sender, instance, created, **kwargs):
+    if created:
+        change_counter(User, "followers_count", instance.author_id, 1)
+        feed.followed(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_removed(sender, instance, **kwargs):
+    change_counter(User, "followers_count", instance.author_id, -1)
+    feed.unfollowed(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Amount)
+def recipe_amount_saved(sender, instance, **kwargs):
+    # Ингредиент строки мог смениться, поэтому корзины пересчитываются целиком.
+    carts.refresh_recipe_carts(instance.recipe_id)
+    schedule_search_update(instance.recipe_id)
+    recipe_output_changed(instance.recipe_id)
+
+
+@receiver(post_delete, sender=Amount)
+def recipe_amount_deleted(sender, instance, **kwargs):
+    carts.refresh_recipe_carts(instance.recipe_id, [instance.ingredient_id])
+    schedule_search_update(instance.recipe_id)
+    recipe_output_changed(instance.recipe_id)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def recipe_changed(sender, instance, **kwargs):
+    schedule_search_update(instance.pk)
+    recipe_output_changed(instance.pk)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(sender, instance, created, **kwargs):
+    if created:
+        change_counter(User, "recipes_count", instance.author_id, 1)
+        feed.recipe_published(instance)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    change_counter(User, "recipes_count", instance.author_id, -1)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith("post_"):
+        return
+    if reverse:
+        recipe_output_changed(*(pk_set or ()))
+    else:
+        recipe_output_changed(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, created, update_fields=None, **kwargs):
+    # Сохранение last_login при входе не меняет выдачу рецептов.
+    if created or (
+        update_fields is not None
+        and not USER_PUBLIC_FIELDS.intersection(update_fields)
+    ):
+        return
+    recipe_output_changed(
+        *instance.recipes.values_list("id", flat=True)
+    )
+
+
+@receiver(post_save, sender=User)
+def user_auth_changed(sender, instance, created, update_fields=None, **kwargs):
+    # Пароль, is_active и профиль лежат в кеше токенов вместе с токеном.
+    if created or update_fields is not None and set(update_fields) == {
+        "last_login"
+    }:
+        return
+    invalidate_tokens(
+        *Token.objects.filter(user=instance).values_list("key", flat=True)
+    )
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    invalidate_tokens(instance.key)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def ingredients_changed(sender, instance, created=False, **kwargs):
+    bump_versions_on_commit(INGREDIENTS_VERSION)
+    if not created:
+        for recipe_id in instance.ingredients.values_list(
+            "recipe_id", flat=True
+        ):
+            schedule_search_update(recipe_id)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tags_changed(sender, **kwargs):
+    bump_versions_on_commit(TAGS_VERSION)
@@ -0,0 +1,34 @@
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+
+# Кусков синхронного итератора на один переход в поток под ASGI.
+ASYNC_BATCH_SIZE = 100
+
+
+async def aiterate(iterator):
+    """Синхронный итератор как асинхронный.
+
+    Куски читаются пачками в потоке запроса через sync_to_async, там же,
+    где открыт курсор базы.
+    """
+    iterator = iter(iterator)
+    take = sync_to_async(lambda: list(islice(iterator, ASYNC_BATCH_SIZE)))
+    while True:
+        batch = await take()
+        if not batch:
+            return
+        for chunk in batch:
+            yield chunk
+
+
+def streaming_content(request, iterator):
+    """Содержимое StreamingHttpResponse под сервер запроса.
+
+    Синхронный итератор под ASGI Django собирает в список целиком,
+    поэтому там он отдаётся асинхронным.
+    """
+    if isinstance(getattr(request, "_request", request), ASGIRequest):
+        return aiterate(iterator)
+    return iterator
@@ -0,0 +1,40 @@
+from rest_framework.test import APITestCase
+
+from api.models import User
+
+URL = "/api/recipes/download_shopping_cart/"
+
+
+class ShoppingListExportTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email="user@example.com",
+            username="user",
+            password="password-12345",
+            first_name="Имя",
+            last_name="Фамилия",
+        )
+
+    def test_errors_are_json(self):
+        for export_format in ("", "pdf", "txt", "csv", "json"):
+            with self.subTest(export_format=export_format):
+                response = self.client.get(
+                    URL, {"format": export_format} if export_format else {}
+                )
+                self.assertEqual(response.status_code, 401)
+                self.assertEqual(response["Content-Type"], "application/json")
+                self.assertIn("detail", response.json())
+
+    def test_formats(self):
+        self.client.force_authenticate(self.user)
+        for export_format, content_type in (
+            ("pdf", "application/pdf"),
+            ("txt", "text/plain; charset=utf-8"),
+            ("csv", "text/csv; charset=utf-8"),
+            ("json", "application/json; charset=utf-8"),
+        ):
+            with self.subTest(export_format=export_format):
+                response = self.client.get(URL, {"format": export_format})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response["Content-Type"], content_type)
@@ -0,0 +1,71 @@
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from api.models import Ingredient
+
+
+class IngredientSearchTest(APITestCase):
+    """Индекс в памяти и запрос к базе находят одно и то же."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Ingredient.objects.bulk_create(
+            Ingredient(name=name, measurement_unit="г")
+            for name in (
+                "Молоко",
+                "молочный шоколад",
+                "Мука",
+                "сухое молоко",
+                "Milk",
+                "milk chocolate",
+                "Соль (морская)",
+            )
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def search(self, params):
+        names = {}
+        for prefix_index in (True, False):
+            with override_settings(INGREDIENT_PREFIX_INDEX=prefix_index):
+                for extra in ({}, {"format": "json"}):
+                    response = self.client.get(
+                        "/api/ingredients/", {**params, **extra}
+                    )
+                    self.assertEqual(response.status_code, 200)
+                    names[prefix_index, bool(extra)] = [
+                        ingredient["name"] for ingredient in response.json()
+                    ]
+        self.assertEqual(len(set(map(tuple, names.values()))), 1, names)
+        return names[True, False]
+
+    def test_cyrillic_prefix(self):
+        for query in ("мол", "МОЛ", "Мол"):
+            with self.subTest(query=query):
+                self.assertEqual(
+                    sorted(self.search({"name": query})),
+                    ["Молоко", "молочный шоколад"],
+                )
+
+    def test_latin_prefix(self):
+        self.assertEqual(
+            sorted(self.search({"name": "MIL"})), ["Milk", "milk chocolate"]
+        )
+
+    def test_special_characters(self):
+        self.assertEqual(self.search({"name": "соль ("}), ["Соль (морская)"])
+        self.assertEqual(self.search({"name": "."}), [])
+
+    def test_limit(self):
+        self.assertEqual(len(self.search({"name": "м", "limit": "2"})), 2)
+
+    def test_detail_ignores_limit(self):
+        pk = Ingredient.objects.get(name="Мука").pk
+        for prefix_index in (True, False):
+            with override_settings(INGREDIENT_PREFIX_INDEX=prefix_index):
+                response = self.client.get(
+                    f"/api/ingredients/{pk}/", {"limit": 1, "format": "json"}
+                )
+                self.assertEqual(response.status_code, 200)
@@ -0,0 +1,124 @@
+from django.contrib.auth.models import AnonymousUser
+from rest_framework.request import Request
+from rest_framework.serializers import ModelSerializer
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from api.models import (
+    Amount,
+    Favorite,
+    Follow,
+    Ingredient,
+    Recipe,
+    Tag,
+    User,
+    UserCart,
+)
+from api.serializers import RecipeSerializer, TinyRecipeSerializer
+
+
+class CompiledReadParityTest(APITestCase):
+    """represent() отдаёт то же, что to_representation() DRF."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.author = (
+            User.objects.create_user(
+                email=f"{name}@example.com",
+                username=name,
+                password="password-12345",
+                first_name="Имя",
+                last_name="Фамилия",
+            )
+            for name in ("reader", "author")
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        tags = [
+            Tag.objects.create(
+                name=f"Тег {number}", color=f"#00000{number}",
+                slug=f"tag{number}",
+            )
+            for number in range(2)
+        ]
+        ingredients = [
+            Ingredient.objects.create(
+                name=f"Ингредиент {number}", measurement_unit="г"
+            )
+            for number in range(3)
+        ]
+        cls.recipes = [
+            Recipe.objects.create(
+                author=cls.author,
+                name="С картинкой",
+                text="Рецепт с картинкой",
+                cooking_time=10,
+                image="recipes/image.png",
+                image_variants={"small": {"webp": "recipes/image.webp"}},
+            ),
+            Recipe.objects.create(
+                author=cls.author,
+                name="Без картинки",
+                text="Рецепт без картинки",
+                cooking_time=5,
+                image="",
+            ),
+        ]
+        for recipe in cls.recipes:
+            recipe.tags.set(tags)
+            Amount.objects.bulk_create(
+                Amount(recipe=recipe, ingredient=ingredient, amount=number)
+                for number, ingredient in enumerate(ingredients, start=1)
+            )
+        Favorite.objects.create(user=cls.user, recipe=cls.recipes[0])
+        UserCart.objects.create(user=cls.user, recipe=cls.recipes[1])
+
+    def request(self, user):
+        request = Request(APIRequestFactory().get("/api/recipes/"))
+        request.user = user
+        return request
+
+    def assert_parity(self, serializer_class, recipes, request):
+        for recipe in recipes:
+            serializer = serializer_class(context={"request": request})
+            compiled = serializer_class.represent(recipe, request)
+            self.assertIsNotNone(compiled)
+            self.assertEqual(
+                compiled,
+                ModelSerializer.to_representation(serializer, recipe),
+            )
+
+    def test_feed_page(self):
+        for user in (self.user, AnonymousUser()):
+            with self.subTest(user=user):
+                request = self.request(user)
+                recipes = list(Recipe.objects.for_feed(user).order_by("id"))
+                self.assert_parity(RecipeSerializer, recipes, request)
+                self.assert_parity(TinyRecipeSerializer, recipes, request)
+
+    def test_flags(self):
+        recipes = list(Recipe.objects.for_feed(self.user).order_by("id"))
+        data = RecipeSerializer(
+            recipes, many=True, context={"request": self.request(self.user)}
+        ).data
+        self.assertEqual(
+            [
+                (item["is_favorited"], item["is_in_shopping_cart"])
+                for item in data
+            ],
+            [(True, False), (False, True)],
+        )
+        self.assertTrue(data[0]["author"]["is_subscribed"])
+        self.assertIsNone(data[1]["image"])
+        self.assertEqual(data[1]["image_variants"], {})
+
+    def test_missing_annotations(self):
+        request = self.request(self.user)
+        for recipe in Recipe.objects.order_by("id"):
+            self.assertIsNone(RecipeSerializer.represent(recipe, request))
+            expected = RecipeSerializer(
+                Recipe.objects.for_feed(self.user).get(pk=recipe.pk),
+                context={"request": request},
+            ).data
+            self.assertEqual(
+                RecipeSerializer(recipe, context={"request": request}).data,
+                expected,
+            )
@@ -0,0 +1,100 @@
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+
+from api.authentication import token_cache
+from rest_framework.authtoken.models import Token
+
+from api.models import Follow, Recipe, User
+
+
+class UserQueriesTest(APITestCase):
+    """Число запросов эндпоинтов пользователей не растёт с их числом."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(
+                email=f"user{number}@example.com",
+                username=f"user{number}",
+                password="password-12345",
+                first_name="Имя",
+                last_name="Фамилия",
+            )
+            for number in range(5)
+        ]
+        cls.user = cls.users[0]
+        for author in cls.users[1:3]:
+            Follow.objects.create(user=cls.user, author=author)
+            for number in range(3):
+                Recipe.objects.create(
+                    author=author,
+                    name=f"Рецепт {number}",
+                    text=f"Рецепт {author.pk} {number}",
+                    cooking_time=10,
+                    image="recipes/image.png",
+                )
+
+    def setUp(self):
+        cache.clear()
+        token_cache.entries.clear()
+        self.client.force_authenticate(self.user)
+
+    def test_list(self):
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/users/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], len(self.users))
+        self.assertEqual(
+            [user["is_subscribed"] for user in response.data["results"]],
+            [False, True, True, False, False],
+        )
+
+    def test_list_anonymous(self):
+        self.client.force_authenticate(None)
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/users/")
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(
+            any(user["is_subscribed"] for user in response.data["results"])
+        )
+
+    def test_retrieve(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(f"/api/users/{self.users[1].pk}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data["is_subscribed"])
+
+    def test_me(self):
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/users/me/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["id"], self.user.pk)
+        self.assertFalse(response.data["is_subscribed"])
+
+    def test_subscriptions_recipes_limit(self):
+        token = Token.objects.create(user=self.user)
+        for authenticate in (
+            lambda: self.client.force_authenticate(self.user),
+            # С токеном запрос обслуживает async-обработчик.
+            lambda: self.client.credentials(
+                HTTP_AUTHORIZATION=f"Token {token.key}"
+            ),
+        ):
+            self.client.force_authenticate(None)
+            authenticate()
+            for recipes_limit, count in (
+                ("1", 1), ("abc", 3), ("-1", 3), ("0", 3), ("", 3)
+            ):
+                with self.subTest(recipes_limit=recipes_limit):
+                    response = self.client.get(
+                        "/api/users/subscriptions/",
+                        {"recipes_limit": recipes_limit},
+                    )
+                    self.assertEqual(response.status_code, 200)
+                    self.assertEqual(
+                        [
+                            len(author["recipes"])
+                            for author in response.json()["results"]
+                        ],
+                        [count, count],
+                    )
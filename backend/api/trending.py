@@ -0,0 +1,62 @@
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count
+from django.db.models.functions import TruncHour
+from django.db.transaction import atomic
+from django.utils import timezone
+
+from .models import Favorite, TrendingScore, UserCart
+from .versions import TRENDING_VERSION, bump_versions_on_commit
+
+# Модель добавлений рецепта и вес одного добавления в оценке.
+INTERACTIONS = ((Favorite, 1.0), (UserCart, 0.5))
+
+
+def compute_scores(now):
+    """Оценки рецептов за окно TRENDING_WINDOW_HOURS.
+
+    Каждое добавление весит weight * 2 ** (-возраст / полупериод).
+    Строки группируются по часам в базе, поэтому возраст считается с
+    точностью до часа, а в Python приходит не больше строки на рецепт
+    в час.
+    """
+    since = now - timedelta(hours=settings.TRENDING_WINDOW_HOURS)
+    decay = math.log(2) / (settings.TRENDING_HALF_LIFE_HOURS * 3600)
+    scores = defaultdict(float)
+    for model, weight in INTERACTIONS:
+        rows = model.objects.filter(created__gte=since).annotate(
+            hour=TruncHour("created")
+        ).order_by().values("recipe_id", "hour").annotate(count=Count("pk"))
+        for row in rows.iterator(chunk_size=settings.DB_STREAM_CHUNK_SIZE):
+            age = max((now - row["hour"]).total_seconds(), 0)
+            scores[row["recipe_id"]] += (
+                weight * row["count"] * math.exp(-decay * age)
+            )
+    return scores
+
+
+@atomic()
+def score_trending(now=None):
+    """Пересчитывает TrendingScore, возвращает число рецептов в ней."""
+    now = now or timezone.now()
+    scores = {
+        recipe_id: score
+        for recipe_id, score in compute_scores(now).items()
+        if score >= settings.TRENDING_MIN_SCORE
+    }
+    TrendingScore.objects.bulk_create(
+        (
+            TrendingScore(recipe_id=recipe_id, score=score, computed=now)
+            for recipe_id, score in scores.items()
+        ),
+        batch_size=settings.DB_STREAM_CHUNK_SIZE,
+        update_conflicts=True,
+        unique_fields=["recipe"],
+        update_fields=["score", "computed"],
+    )
+    TrendingScore.objects.exclude(computed=now).delete()
+    bump_versions_on_commit(TRENDING_VERSION)
+    return len(scores)
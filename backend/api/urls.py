@@ -1,7 +1,7 @@
-from django.urls import path, include
+from django.urls import path, include, re_path
 from rest_framework.routers import DefaultRouter
 
-from . import views
+from . import async_views, views
 
 
 router = DefaultRouter()
@@ -10,6 +10,22 @@ router.register("tags", views.TagsViewSet)
 router.register("ingredients", views.IngredientsViewSet)
 router.register("users", views.CurrentUserViewSet)
 
+# GET горячих маршрутов обслуживают async-обработчики, остальные
+# методы и маршруты с суффиксом формата остаются за ViewSet. Порядок
+# маршрутов роутера сохраняется, иначе detail перехватит экшены.
+router_urls = [
+    re_path(
+        str(url.pattern),
+        async_views.HANDLERS[url.name](url.callback),
+        name=url.name,
+    )
+    if url.name in async_views.HANDLERS
+    and "format" not in url.pattern.regex.groupindex
+    else url
+    for url in router.urls
+]
+
 urlpatterns = [
-    path("", include(router.urls)),
+    path("metrics/", views.metrics, name="metrics"),
+    path("", include(router_urls)),
 ]
@@ -0,0 +1,116 @@
+import time
+from datetime import datetime, timezone
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import transaction
+from django.views.decorators.http import condition
+
+KEY_PREFIX = "version"
+TAGS_VERSION = "tags"
+INGREDIENTS_VERSION = "ingredients"
+RECIPES_VERSION = "recipes"
+POPULARITY_VERSION = "popularity"
+TRENDING_VERSION = "trending"
+
+
+def recipe_version(recipe_id):
+    return f"recipe:{recipe_id}"
+
+
+def version_key(name):
+    return f"{KEY_PREFIX}:{name}"
+
+
+def get_version(name):
+    """Текущая версия набора данных name.
+
+    Версия - время последнего изменения в наносекундах, поэтому
+    после очистки кеша она не совпадёт с уже выданной.
+    """
+    key = version_key(name)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def get_versions(names):
+    """Версии нескольких наборов данных одним обращением к кешу."""
+    keys = {version_key(name): name for name in names}
+    versions = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in versions}
+    for key, version in missing.items():
+        cache.add(key, version, timeout=None)
+    if missing:
+        versions.update(cache.get_many(missing))
+    return [versions.get(key) for key in keys]
+
+
+def bump_version(name):
+    version = time.time_ns()
+    cache.set(version_key(name), version, timeout=None)
+    return version
+
+
+def bump_versions_on_commit(*names):
+    """Меняет версии после коммита.
+
+    Иначе параллельный запрос успеет закешировать данные
+    до коммита под новой версией.
+    """
+    transaction.on_commit(
+        lambda: cache.set_many(
+            {version_key(name): time.time_ns() for name in names},
+            timeout=None,
+        )
+    )
+
+
+def versioned_condition(name):
+    """Декоратор ETag/Last-Modified по версии набора данных.
+
+    На If-None-Match с текущей версией отвечает 304 до
+    аутентификации и обращений к базе.
+    """
+
+    def etag(request, *args, **kwargs):
+        return f'"{name}-{get_version(name)}"'
+
+    def last_modified(request, *args, **kwargs):
+        return datetime.fromtimestamp(
+            get_version(name) / 10 ** 9, tz=timezone.utc
+        )
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
+
+
+class VersionedCache:
+    """Кеш процесса, очищаемый при смене версии набора данных."""
+
+    def __init__(self, name):
+        self.name = name
+        self.version = None
+        self.values = {}
+
+    def get_or_set(self, key, default):
+        version = get_version(self.name)
+        if version != self.version:
+            self.values = {}
+            self.version = version
+        values = self.values
+        if key not in values:
+            values[key] = default()
+        return values[key]
+
+    async def aget_or_set(self, key, default):
+        """То же для async-кода, default - корутинная функция."""
+        version = await sync_to_async(get_version)(self.name)
+        if version != self.version:
+            self.values = {}
+            self.version = version
+        values = self.values
+        if key not in values:
+            values[key] = await default()
+        return values[key]
@@ -1,31 +1,36 @@
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.conf import settings
+from django.db.models import F
+from django.http import Http404, HttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.decorators import method_decorator
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfgen import canvas
 from rest_framework import viewsets, status
-from rest_framework.decorators import action
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.viewsets import ReadOnlyModelViewSet
 
-from .filters import AuthorTagFilter, IngredientFilter
+from .exports import SHOPPING_LIST_RENDERERS, export_shopping_list
+from .filters import AuthorTagFilter, IngredientFilter, get_limit
+from .ingredient_index import get_index
+from .metrics import TimedSerializerMixin, registry
 from .models import (
+    CartIngredient,
     Ingredient,
     Recipe,
     Tag,
     Favorite,
     UserCart,
-    Amount,
     User,
     Follow,
 )
-from .permissions import RecipeOwner
+from .pagination import FeedPagination, PageOrKeysetPagination
+from .permissions import MetricsScraper, RecipeOwner
+from .renderers import StreamingJSONMixin
+from .response_cache import AnonymousResponseCacheMixin
 from .serializers import (
+    CartIngredientSerializer,
     RecipeSerializer,
     TagSerializer,
     IngredientSerializer,
@@ -33,24 +38,49 @@ from .serializers import (
     FollowSerializer,
     RecipeCreateSerializer,
 )
+from .versions import (
+    INGREDIENTS_VERSION,
+    TAGS_VERSION,
+    VersionedCache,
+    versioned_condition,
+)
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(
+    TimedSerializerMixin, AnonymousResponseCacheMixin, viewsets.ModelViewSet
+):
     queryset = Recipe.objects.all()
     serializer_class = RecipeCreateSerializer
-    pagination_class = PageNumberPagination
+    pagination_class = PageOrKeysetPagination
+    keyset_ordering = ("-pub_date", "-id")
     permission_classes = (RecipeOwner,)
     filterset_class = AuthorTagFilter
     filter_backends = (DjangoFilterBackend,)
 
     def get_serializer_class(self):
-        if self.action in ("list", "retrieve",):
+        if self.action in ("list", "retrieve", "feed"):
             return RecipeSerializer
         return RecipeCreateSerializer
 
+    def get_queryset(self):
+        if self.action in ("list", "retrieve", "feed"):
+            return Recipe.objects.for_feed(self.request.user)
+        return super().get_queryset()
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    @action(
+        detail=False,
+        permission_classes=[IsAuthenticated],
+        pagination_class=FeedPagination,
+    )
+    def feed(self, request):
+        """Рецепты авторов из подписок, от новых к старым."""
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
     @action(
         detail=True,
         methods=["post", "delete"],
@@ -75,46 +105,34 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return self.__delete(UserCart, request.user, pk)
 
     @action(
-        detail=False, methods=["get"], permission_classes=[IsAuthenticated]
+        detail=False,
+        methods=["get"],
+        permission_classes=[IsAuthenticated],
+        renderer_classes=SHOPPING_LIST_RENDERERS,
     )
     def download_shopping_cart(self, request):
-        shopping_list = {}
-        ingredients = Amount.objects.filter(
-            recipe__in_user_cart__user=request.user
+        ingredients = CartIngredient.objects.filter(
+            user=request.user
         ).values(
-            "ingredient__name", "ingredient__measurement_unit",
-        ).annotate(
-            total_amount=Sum('amount')
-        ).order_by('ingredient__name')
-
-        pdfmetrics.registerFont(TTFont("Cornerita", "Cornerita.ttf", "UTF-8"))
-        response = HttpResponse()
-        response["Content-Type"] = "application/pdf"
-        response[
-            "Content-Disposition"
-        ] = 'attachment; filename="shopping_list.pdf"'
-        shopping_list_pdf = canvas.Canvas(response)
-        shopping_list_pdf.setFont("Cornerita", size=18)
-        font_size = 12
-        line_size = int(font_size * 1.5)
-        v_offset = line_size * len(shopping_list) + 600
-        shopping_list_pdf.drawString(200, v_offset + 50, "список покупок")
-        shopping_list_pdf.setFont("Cornerita", size=font_size)
-        line_no = 1
-        for ingredient in ingredients:
-            shopping_list_pdf.drawString(
-                70,
-                v_offset,
-                (f"{line_no}. {ingredient['ingredient__name']} - "
-                 f"{ingredient['total_amount']}"
-                 f"{ingredient['ingredient__measurement_unit']}")
-            )
-            line_no += 1
-            v_offset -= line_size
-        shopping_list_pdf.showPage()
-        shopping_list_pdf.save()
+            name=F("ingredient__name"),
+            measurement_unit=F("ingredient__measurement_unit"),
+            total_amount=F("total"),
+        ).order_by("name")
+        return export_shopping_list(
+            request,
+            ingredients.iterator(chunk_size=settings.DB_STREAM_CHUNK_SIZE),
+            request.accepted_renderer.format,
+        )
 
-        return response
+    @action(
+        detail=False, methods=["get"], permission_classes=[IsAuthenticated]
+    )
+    def shopping_cart_summary(self, request):
+        ingredients = CartIngredient.objects.filter(
+            user=request.user
+        ).select_related("ingredient").order_by("ingredient__name")
+        serializer = CartIngredientSerializer(ingredients, many=True)
+        return Response(serializer.data)
 
     def __add(self, model, user, pk):
         if model.objects.filter(user=user, recipe__id=pk).exists():
@@ -137,22 +155,80 @@ class RecipeViewSet(viewsets.ModelViewSet):
         )
 
 
-class TagsViewSet(ReadOnlyModelViewSet):
+@method_decorator(versioned_condition(TAGS_VERSION), name="dispatch")
+class TagsViewSet(
+    TimedSerializerMixin, StreamingJSONMixin, ReadOnlyModelViewSet
+):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
+    cache = VersionedCache(TAGS_VERSION)
+
+    def list(self, request, *args, **kwargs):
+        return Response(self.cache.get_or_set(
+            "list", lambda: super(TagsViewSet, self).list(
+                request, *args, **kwargs
+            ).data
+        ))
 
+    def retrieve(self, request, *args, **kwargs):
+        return Response(self.cache.get_or_set(
+            ("retrieve", kwargs[self.lookup_field]),
+            lambda: super(TagsViewSet, self).retrieve(
+                request, *args, **kwargs
+            ).data
+        ))
 
-class IngredientsViewSet(ReadOnlyModelViewSet):
+
+@method_decorator(versioned_condition(INGREDIENTS_VERSION), name="dispatch")
+class IngredientsViewSet(
+    TimedSerializerMixin, StreamingJSONMixin, ReadOnlyModelViewSet
+):
     serializer_class = IngredientSerializer
     queryset = Ingredient.objects.all()
     filter_backends = [IngredientFilter]
-    search_fields = ["^name"]
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        limit = get_limit(request)
+        if not settings.INGREDIENT_PREFIX_INDEX:
+            queryset = self.filter_queryset(self.get_queryset())[:limit]
+            return Response(self.get_serializer(queryset, many=True).data)
+        index = get_index()
+        name = request.query_params.get(IngredientFilter.search_param)
+        if name:
+            return Response(index.search(name, limit))
+        return Response(index.all(limit))
+
+    def retrieve(self, request, *args, **kwargs):
+        if not settings.INGREDIENT_PREFIX_INDEX:
+            return super().retrieve(request, *args, **kwargs)
+        pk = kwargs[self.lookup_field]
+        ingredient = get_index().by_id.get(int(pk) if pk.isdigit() else None)
+        if ingredient is None:
+            raise Http404
+        return Response(ingredient)
+
+
+class CurrentUserViewSet(TimedSerializerMixin, UserViewSet):
+    pagination_class = PageOrKeysetPagination
+    keyset_ordering = ("id",)
 
-class CurrentUserViewSet(UserViewSet):
-    pagination_class = PageNumberPagination
+    def get_serializer_class(self):
+        if self.action in ("create_subscribe", "subscriptions"):
+            return FollowSerializer
+        return super().get_serializer_class()
+
+    def get_queryset(self):
+        return super().get_queryset().with_is_subscribed(
+            self.request.user
+        ).order_by(*self.keyset_ordering)
+
+    def get_instance(self):
+        user = super().get_instance()
+        # Подписку на себя запрещает ограничение is_not_following.
+        user.is_subscribed = False
+        return user
 
     @action(detail=True, permission_classes=[IsAuthenticated])
     def subscribe(self, request, id=None):
@@ -169,10 +245,8 @@ class CurrentUserViewSet(UserViewSet):
                 {"errors": "вы уже подписаны"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        following = Follow.objects.create(
-            user=current_user, author=recipe_owner
-        )
-        serializer = FollowSerializer(following, context={"request": request})
+        Follow.objects.create(user=current_user, author=recipe_owner)
+        serializer = self.get_serializer(recipe_owner)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     @subscribe.mapping.delete
@@ -192,10 +266,19 @@ class CurrentUserViewSet(UserViewSet):
 
     @action(detail=False, permission_classes=[IsAuthenticated])
     def subscriptions(self, request):
-        current_user = request.user
-        authors = User.objects.filter(author__user=current_user)
-        pages = self.paginate_queryset(authors)
-        serializer = FollowSerializer(
-            pages, context={"request": request}, many=True
+        authors = User.objects.subscriptions(
+            request.user, get_limit(request, "recipes_limit")
         )
+        pages = self.paginate_queryset(authors)
+        serializer = self.get_serializer(pages, many=True)
         return self.get_paginated_response(serializer.data)
+
+
+@api_view(["GET"])
+@permission_classes([MetricsScraper])
+def metrics(request):
+    """Гистограммы времени запросов в формате Prometheus."""
+    return HttpResponse(
+        registry.render(),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
@@ -0,0 +1,35 @@
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+
+from .pool import get_pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL, где соединения берутся из пула процесса.
+
+    close() возвращает соединение в пул, поэтому с CONN_MAX_AGE = 0
+    оно освобождается в конце каждого запроса, в том числе под ASGI,
+    где у запросов нет постоянных потоков.
+    """
+
+    @property
+    def pool(self):
+        return get_pool(self.alias, self.settings_dict.get("POOL", {}))
+
+    def get_new_connection(self, conn_params):
+        connection = self.pool.acquire(
+            lambda: super(DatabaseWrapper, self).get_new_connection(
+                conn_params
+            )
+        )
+        self.isolation_level = IsolationLevel(
+            self.settings_dict["OPTIONS"].get(
+                "isolation_level", IsolationLevel.READ_COMMITTED
+            )
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.pool.release(self.connection)
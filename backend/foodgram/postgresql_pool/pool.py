@@ -0,0 +1,144 @@
+import time
+from collections import deque
+from threading import Condition, Lock
+
+import psycopg2
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+EVENTS = ("created", "reused", "closed", "failed_checks", "waits", "timeouts")
+
+_pools = {}
+_pools_lock = Lock()
+
+
+class ConnectionPool:
+    """Пул соединений psycopg2, общий для всех потоков процесса.
+
+    Перед выдачей соединение проверяется: не закрыто, без открытой
+    транзакции, а простоявшее дольше check_after - ещё и SELECT 1.
+    """
+
+    def __init__(
+        self, min_size=2, max_size=10, timeout=5, max_idle=300,
+        check_after=30,
+    ):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.check_after = check_after
+        self.idle = deque()
+        self.size = 0
+        self.condition = Condition()
+        self.events = dict.fromkeys(EVENTS, 0)
+
+    def acquire(self, connect):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            with self.condition:
+                self.close_expired()
+                if self.idle:
+                    connection, released_at = self.idle.pop()
+                elif self.size < self.max_size:
+                    self.size += 1
+                    connection = None
+                else:
+                    self.events["waits"] += 1
+                    if not self.condition.wait(deadline - time.monotonic()):
+                        self.events["timeouts"] += 1
+                        raise psycopg2.OperationalError(
+                            f"Нет свободных соединений в пуле за "
+                            f"{self.timeout} с"
+                        )
+                    continue
+            if connection is None:
+                try:
+                    connection = connect()
+                except Exception:
+                    self.discard(None)
+                    raise
+                self.count("created")
+                return connection
+            if self.healthy(connection, released_at):
+                self.count("reused")
+                return connection
+            self.count("failed_checks")
+            self.discard(connection)
+
+    def release(self, connection):
+        if connection.closed:
+            self.discard(None)
+            return
+        try:
+            if connection.info.transaction_status != TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+        except psycopg2.Error:
+            self.discard(connection)
+            return
+        with self.condition:
+            self.idle.append((connection, time.monotonic()))
+            self.condition.notify()
+
+    def healthy(self, connection, released_at):
+        if connection.closed:
+            return False
+        if connection.info.transaction_status != TRANSACTION_STATUS_IDLE:
+            return False
+        if time.monotonic() - released_at < self.check_after:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+        except psycopg2.Error:
+            return False
+        return True
+
+    def discard(self, connection):
+        if connection is not None and not connection.closed:
+            connection.close()
+        with self.condition:
+            self.size -= 1
+            if connection is not None:
+                self.events["closed"] += 1
+            self.condition.notify()
+
+    def close_expired(self):
+        """Закрывает самые старые простаивающие соединения сверх min_size."""
+        now = time.monotonic()
+        while (
+            self.idle and self.size > self.min_size
+            and now - self.idle[0][1] > self.max_idle
+        ):
+            connection, _ = self.idle.popleft()
+            connection.close()
+            self.size -= 1
+            self.events["closed"] += 1
+
+    def count(self, event):
+        with self.condition:
+            self.events[event] += 1
+
+    def stats(self):
+        with self.condition:
+            return {
+                "size": self.size,
+                "idle": len(self.idle),
+                "in_use": self.size - len(self.idle),
+                **self.events,
+            }
+
+
+def get_pool(alias, options):
+    with _pools_lock:
+        if alias not in _pools:
+            _pools[alias] = ConnectionPool(
+                **{key.lower(): value for key, value in options.items()}
+            )
+        return _pools[alias]
+
+
+def pool_stats():
+    """Статистика пулов по алиасам баз."""
+    with _pools_lock:
+        pools = dict(_pools)
+    return {alias: pool.stats() for alias, pool in pools.items()}
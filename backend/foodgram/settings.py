@@ -31,6 +31,7 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = "api.User"
 
 MIDDLEWARE = [
+    "api.metrics.ServerTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
@@ -76,9 +77,60 @@ DATABASES = {
         "PASSWORD": os.environ.get("POSTGRES_PASSWORD"),
         "HOST": os.environ.get("DB_HOST"),
         "PORT": os.environ.get("DB_PORT"),
+        # Под ASGI постоянные соединения не переживают запрос, для
+        # повторного использования там нужен пул:
+        # DB_ENGINE=foodgram.postgresql_pool.
+        "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", 0)),
+        "CONN_HEALTH_CHECKS": (
+            os.getenv("DB_CONN_HEALTH_CHECKS", "True") == "True"
+        ),
+        "DISABLE_SERVER_SIDE_CURSORS": (
+            os.getenv("DB_DISABLE_SERVER_SIDE_CURSORS", "False") == "True"
+        ),
+        "POOL": {
+            "MIN_SIZE": int(os.getenv("DB_POOL_MIN_SIZE", 2)),
+            "MAX_SIZE": int(os.getenv("DB_POOL_MAX_SIZE", 10)),
+            "TIMEOUT": float(os.getenv("DB_POOL_TIMEOUT", 5)),
+            "MAX_IDLE": float(os.getenv("DB_POOL_MAX_IDLE", 300)),
+            "CHECK_AFTER": float(os.getenv("DB_POOL_CHECK_AFTER", 30)),
+        },
     }
 }
 
+# Размер пачки серверного курсора для потоковых выгрузок.
+DB_STREAM_CHUNK_SIZE = int(os.getenv("DB_STREAM_CHUNK_SIZE", 2000))
+
+# Популярность для ?ordering=trending: окно и полупериод затухания в часах.
+TRENDING_WINDOW_HOURS = int(os.getenv("TRENDING_WINDOW_HOURS", 24 * 7))
+TRENDING_HALF_LIFE_HOURS = float(os.getenv("TRENDING_HALF_LIFE_HOURS", 24))
+TRENDING_MIN_SCORE = float(os.getenv("TRENDING_MIN_SCORE", 0.01))
+
+# С этого числа подписчиков лента читает рецепты автора напрямую.
+FEED_FANOUT_MAX_FOLLOWERS = int(os.getenv("FEED_FANOUT_MAX_FOLLOWERS", 10000))
+
+# Версии индекса ингредиентов, кеша тегов, ETag и токенов должны быть
+# общими для процессов, в docker-compose это Redis. LocMemCache без
+# DEBUG даёт предупреждение api.W001.
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.getenv("CACHE_LOCATION", ""),
+    }
+}
+
+RESPONSE_CACHE_TIMEOUT = int(os.getenv("RESPONSE_CACHE_TIMEOUT", 300))
+
+# Токен Prometheus для /api/metrics/, пустой - только администраторы.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# Списки от этой длины рендерятся в ответ потоком.
+JSON_STREAM_MIN_ITEMS = int(os.getenv("JSON_STREAM_MIN_ITEMS", 500))
+
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", 10000))
+AUTH_TOKEN_CACHE_TIMEOUT = int(os.getenv("AUTH_TOKEN_CACHE_TIMEOUT", 60))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -98,8 +150,17 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticatedOrReadOnly",
     ],
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "api.renderers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "api.authentication.CachedTokenAuthentication",
     ],
     "DEFAULT_FILTER_BACKEND": [
         "django_filters.rest_framework.DjangoFilterBackend",
@@ -138,6 +199,12 @@ STATIC_ROOT = os.path.join(BASE_DIR, "static")
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", 2))
+
 # DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 CORS_ORIGIN_ALLOW_ALL = True
+
+SEARCH_CONFIG = os.getenv("SEARCH_CONFIG", "russian")
+
+INGREDIENT_PREFIX_INDEX = os.getenv("INGREDIENT_PREFIX_INDEX", "True") == "True"